@@ -0,0 +1,311 @@
+"""Deduplicating, content-addressed archive of raw test suite results.
+
+Consecutive runs of a suite against the same IUT produce raw EARL documents
+that are nearly identical - mostly the dates and a few outcomes differ. Each
+document is therefore split into chunks right before the start tags of the
+elements that tend to change independently of each other (assertions, test
+requirements, test cases, dates and outcomes). Chunks are identified by
+their sha256 digest and only stored once, no matter how many runs use them.
+
+The chunks that a run adds to the archive are compressed together, as a
+single pack, since individually they are too small to compress well. Each
+run keeps a compressed manifest with the ids of its chunks, in document
+order, from which the original document is reconstructed byte for byte -
+either in full or streamed, chunk by chunk, straight into the XML parser.
+Very small chunks are not worth indexing and are kept in the manifest.
+
+The archive is a SQLite database.
+"""
+
+import datetime as dt
+import hashlib
+import io
+import logging
+import re
+import sqlite3
+import struct
+import typing
+import zlib
+from pathlib import Path
+
+import pydantic
+
+from . import exceptions
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packs (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    pack_id INTEGER NOT NULL REFERENCES packs (id),
+    pack_offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL UNIQUE,
+    num_chunks INTEGER NOT NULL,
+    manifest BLOB NOT NULL
+);
+"""
+
+# split right before the start tags of these elements, whatever their prefix
+_BOUNDARY_PATTERN = re.compile(
+    rb"<(?:[\w.-]+:)?(?:Assertion|TestRequirement|TestCase|date|outcome)[\s/>]")
+# smaller chunks, like dates, are mostly unique to a run. Indexing them would
+# cost more than storing them, so they are stored in the run's manifest
+_MAX_INLINE_CHUNK_SIZE = 256
+_MANIFEST_ENTRY = struct.Struct("<q")
+
+
+class ArchivedRun(pydantic.BaseModel):
+    id: int
+    name: str
+    archived_at: dt.datetime
+    size: int
+    digest: str
+    num_chunks: int
+
+
+class ArchiveStats(pydantic.BaseModel):
+    num_runs: int
+    num_chunks: int
+    num_packs: int
+    # size of all runs, as they were added
+    raw_size: int
+    # size of the compressed packs and manifests
+    stored_size: int
+
+
+class Archive:
+
+    def __init__(self, path: Path | str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "Archive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add(self, raw_result: bytes, name: str) -> ArchivedRun:
+        """Archive a raw result, storing only the chunks that are new.
+
+        A result that has already been archived is not stored again and the
+        existing run is returned instead.
+        """
+        digest = hashlib.sha256(raw_result).hexdigest()
+        if (existing := self._get_run_by_digest(digest)) is not None:
+            logger.info(f"{name!r} has already been archived as run {existing.id}")
+            return existing
+        chunks = split_raw_result(raw_result)
+        chunk_digests = [
+            hashlib.sha256(chunk).digest()
+            if len(chunk) > _MAX_INLINE_CHUNK_SIZE else None
+            for chunk in chunks
+        ]
+        with self._connection:
+            chunk_ids: dict[bytes, int] = {}
+            new_chunks: dict[bytes, bytes] = {}
+            for chunk, chunk_digest in zip(chunks, chunk_digests):
+                if (
+                        chunk_digest is None
+                        or chunk_digest in chunk_ids
+                        or chunk_digest in new_chunks
+                ):
+                    continue
+                row = self._connection.execute(
+                    "SELECT id FROM chunks WHERE digest = ?", (chunk_digest,)
+                ).fetchone()
+                if row is not None:
+                    chunk_ids[chunk_digest] = row["id"]
+                else:
+                    new_chunks[chunk_digest] = chunk
+            if new_chunks:
+                # chunks that are new to the archive go into a single pack
+                pack_id = self._connection.execute(
+                    "INSERT INTO packs (data) VALUES (?)",
+                    (zlib.compress(b"".join(new_chunks.values()), level=9),)
+                ).lastrowid
+                pack_offset = 0
+                for chunk_digest, chunk in new_chunks.items():
+                    chunk_ids[chunk_digest] = self._connection.execute(
+                        "INSERT INTO chunks (digest, pack_id, pack_offset, size) "
+                        "VALUES (?, ?, ?, ?)",
+                        (chunk_digest, pack_id, pack_offset, len(chunk))
+                    ).lastrowid
+                    pack_offset += len(chunk)
+            run_id = self._connection.execute(
+                "INSERT INTO runs (name, archived_at, size, digest, num_chunks, "
+                "manifest) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    dt.datetime.now(dt.timezone.utc).isoformat(),
+                    len(raw_result),
+                    digest,
+                    len(chunks),
+                    _serialize_manifest([
+                        chunk if chunk_digest is None else chunk_ids[chunk_digest]
+                        for chunk, chunk_digest in zip(chunks, chunk_digests)
+                    ]),
+                )
+            ).lastrowid
+        logger.debug(
+            f"Archived {name!r} as run {run_id}, adding {len(new_chunks)} of "
+            f"its {len(chunks)} chunks"
+        )
+        return self.get_run(run_id)
+
+    def get_run(self, run_id: int) -> ArchivedRun:
+        row = self._connection.execute(
+            "SELECT id, name, archived_at, size, digest, num_chunks FROM runs "
+            "WHERE id = ?",
+            (run_id,)
+        ).fetchone()
+        if row is None:
+            raise exceptions.OgcCiteActionException(
+                f"Run {run_id} is not in the archive")
+        return ArchivedRun(**row)
+
+    def list_runs(self, limit: int = 20) -> list[ArchivedRun]:
+        rows = self._connection.execute(
+            "SELECT id, name, archived_at, size, digest, num_chunks FROM runs "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [ArchivedRun(**row) for row in rows]
+
+    def get_stats(self) -> ArchiveStats:
+        row = self._connection.execute(
+            "SELECT "
+            "(SELECT count(*) FROM runs) AS num_runs, "
+            "(SELECT count(*) FROM chunks) AS num_chunks, "
+            "(SELECT count(*) FROM packs) AS num_packs, "
+            "(SELECT coalesce(sum(size), 0) FROM runs) AS raw_size, "
+            "(SELECT coalesce(sum(length(data)), 0) FROM packs) "
+            "+ (SELECT coalesce(sum(length(manifest)), 0) FROM runs) "
+            "AS stored_size"
+        ).fetchone()
+        return ArchiveStats(**row)
+
+    def gen_chunks(self, run_id: int) -> typing.Generator[bytes, None, None]:
+        """Yield the chunks of a run, in document order.
+
+        Packs are decompressed when first needed, so the first chunks are
+        available before the whole run has been read.
+        """
+        row = self._connection.execute(
+            "SELECT manifest FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise exceptions.OgcCiteActionException(
+                f"Run {run_id} is not in the archive")
+        packs: dict[int, bytes] = {}
+        for chunk_id in _deserialize_manifest(row["manifest"]):
+            if isinstance(chunk_id, bytes):
+                # an inline chunk
+                yield chunk_id
+                continue
+            pack_id, pack_offset, size = self._connection.execute(
+                "SELECT pack_id, pack_offset, size FROM chunks WHERE id = ?",
+                (chunk_id,)
+            ).fetchone()
+            if (pack := packs.get(pack_id)) is None:
+                pack = packs[pack_id] = zlib.decompress(
+                    self._connection.execute(
+                        "SELECT data FROM packs WHERE id = ?", (pack_id,)
+                    ).fetchone()["data"]
+                )
+            yield pack[pack_offset:pack_offset + size]
+
+    def open_run(self, run_id: int) -> typing.BinaryIO:
+        """Open a run as a binary file, which can be handed to the parser."""
+        return io.BufferedReader(_ChunkReader(self.gen_chunks(run_id)))
+
+    def restore(self, run_id: int) -> bytes:
+        run = self.get_run(run_id)
+        restored = b"".join(self.gen_chunks(run_id))
+        if hashlib.sha256(restored).hexdigest() != run.digest:
+            raise exceptions.OgcCiteActionException(
+                f"Run {run_id} could not be restored: its digest does not match")
+        return restored
+
+    def _get_run_by_digest(self, digest: str) -> ArchivedRun | None:
+        row = self._connection.execute(
+            "SELECT id FROM runs WHERE digest = ?", (digest,)).fetchone()
+        return self.get_run(row["id"]) if row is not None else None
+
+
+class _ChunkReader(io.RawIOBase):
+
+    def __init__(self, chunks: typing.Iterator[bytes]):
+        self._chunks = chunks
+        self._current = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if (chunk := next(self._chunks, None)) is None:
+                return 0
+            self._current = chunk
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+
+def split_raw_result(raw_result: bytes) -> list[bytes]:
+    """Split a raw result into chunks, which can be joined back into it."""
+    boundaries = [
+        match.start() for match in _BOUNDARY_PATTERN.finditer(raw_result)]
+    return [
+        raw_result[start:end]
+        for start, end in zip([0] + boundaries, boundaries + [len(raw_result)])
+        if end > start
+    ]
+
+
+def _serialize_manifest(entries: list[int | bytes]) -> bytes:
+    # a chunk id, or the negated size of an inline chunk followed by the chunk
+    parts = []
+    for entry in entries:
+        if isinstance(entry, bytes):
+            parts.append(_MANIFEST_ENTRY.pack(-len(entry)))
+            parts.append(entry)
+        else:
+            parts.append(_MANIFEST_ENTRY.pack(entry))
+    return zlib.compress(b"".join(parts), level=9)
+
+
+def _deserialize_manifest(
+        manifest: bytes
+) -> typing.Generator[int | bytes, None, None]:
+    data = zlib.decompress(manifest)
+    offset = 0
+    while offset < len(data):
+        (entry,) = _MANIFEST_ENTRY.unpack_from(data, offset)
+        offset += _MANIFEST_ENTRY.size
+        if entry < 0:
+            yield data[offset:offset - entry]
+            offset -= entry
+        else:
+            yield entry
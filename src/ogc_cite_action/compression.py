@@ -0,0 +1,120 @@
+"""Transparent compression of raw test suite results.
+
+Raw EARL results are verbose and compress very well. The compression to use
+when writing is chosen based on the file extension (`.gz`, `.zst` or `.xz`),
+whereas when reading it is detected from the file's magic bytes. Files are
+always streamed, so they can be handed directly to the XML parser without
+needing to be decompressed into memory or a temporary file first.
+
+Support for zstd requires the optional `zstandard` package (or python 3.14+),
+which is installed with the `zstd` extra.
+"""
+
+import enum
+import gzip
+import logging
+import lzma
+import os
+import types
+import typing
+from pathlib import Path
+
+from . import exceptions
+
+logger = logging.getLogger(__name__)
+
+
+class Compression(str, enum.Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    XZ = "xz"
+
+
+_EXTENSIONS = {
+    ".gz": Compression.GZIP,
+    ".gzip": Compression.GZIP,
+    ".zst": Compression.ZSTD,
+    ".zstd": Compression.ZSTD,
+    ".xz": Compression.XZ,
+}
+_MAGIC_BYTES = {
+    b"\x1f\x8b": Compression.GZIP,
+    b"\x28\xb5\x2f\xfd": Compression.ZSTD,
+    b"\xfd7zXZ\x00": Compression.XZ,
+}
+
+
+def get_compression_from_path(path: os.PathLike | str) -> Compression:
+    return _EXTENSIONS.get(Path(path).suffix.lower(), Compression.NONE)
+
+
+def detect_compression(path: os.PathLike | str) -> Compression:
+    """Detect the compression of an existing file by its magic bytes."""
+    with open(path, "rb") as fh:
+        header = fh.read(max(len(magic) for magic in _MAGIC_BYTES))
+    for magic, compression in _MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return compression
+    return Compression.NONE
+
+
+def open_raw_result(
+        path: os.PathLike | str,
+        mode: typing.Literal["rb", "wb"] = "rb",
+        compression: Compression | None = None,
+) -> typing.BinaryIO:
+    """Open a raw result file, (de)compressing it on the fly.
+
+    If `compression` is not given, it is detected from the file contents when
+    reading and from the file extension when writing.
+    """
+    if compression is None:
+        compression = (
+            detect_compression(path) if mode == "rb"
+            else get_compression_from_path(path)
+        )
+    logger.debug(f"Opening {str(path)!r} with {mode=} and {compression=}")
+    if compression == Compression.GZIP:
+        return gzip.open(path, mode)
+    elif compression == Compression.XZ:
+        return lzma.open(path, mode)
+    elif compression == Compression.ZSTD:
+        return _open_zstd(path, mode)
+    else:
+        return open(path, mode)
+
+
+def check_supported(compression: Compression) -> None:
+    """Fail early if the compression needs an optional package which is missing."""
+    if compression == Compression.ZSTD:
+        _import_zstd()
+
+
+def _open_zstd(
+        path: os.PathLike | str,
+        mode: typing.Literal["rb", "wb"]
+) -> typing.BinaryIO:
+    zstd = _import_zstd()
+    if zstd.__name__ != "zstandard":
+        return zstd.open(path, mode)
+    raw_file = open(path, mode)
+    if mode == "rb":
+        return zstd.ZstdDecompressor().stream_reader(raw_file)
+    return zstd.ZstdCompressor().stream_writer(raw_file)
+
+
+def _import_zstd() -> types.ModuleType:
+    """Import the `zstandard` package, or else the standard library's zstd."""
+    try:
+        import zstandard
+    except ImportError:
+        try:
+            from compression import zstd
+        except ImportError as exc:
+            raise exceptions.OgcCiteActionException(
+                "zstd compression requires the optional 'zstandard' package. "
+                "Install it with: pip install 'ogc-cite-action[zstd]'"
+            ) from exc
+        return zstd
+    return zstandard
@@ -1,4 +1,9 @@
+import hashlib
+import json
 import logging
+import os
+import typing
+from pathlib import Path
 
 import jinja2
 import pydantic
@@ -10,6 +15,57 @@ from rich.console import Console
 from rich.logging import RichHandler
 
 from . import models
+from .serializers import fragments
+
+logger = logging.getLogger(__name__)
+
+PACKAGED_PRECOMPILED_TEMPLATES_PATH = Path(__file__).parent / "templates_compiled"
+PRECOMPILED_TEMPLATES_CHECKSUMS_FILE_NAME = "checksums.json"
+
+
+class NetworkSettings(pydantic.BaseModel):
+    connect_timeout_seconds: float = 10
+    pool_timeout_seconds: float = 10
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    max_retries: int = 3
+    retry_backoff_seconds: float = 2
+    retry_status_codes: list[int] = [502, 503, 504]
+    # upper limit for waits between retries, including those asked for by
+    # the server via a Retry-After header
+    retry_max_wait_seconds: float = 60
+
+
+class PreflightRule(pydantic.BaseModel):
+    """Conformance classes an IUT must declare for a test suite to be useful.
+
+    A suite is run when the IUT declares at least one of its
+    `conformance_classes` (or when none are listed). Likewise, a suite input
+    that is listed in `input_conformance_classes` is only passed on to
+    teamengine when the IUT declares at least one of its classes.
+    """
+    conformance_classes: list[str] = []
+    input_conformance_classes: dict[str, list[str]] = {}
+
+
+DEFAULT_PREFLIGHT_RULES = {
+    "ogcapi-features-1.0": PreflightRule(
+        conformance_classes=[
+            "http://www.opengis.net/spec/ogcapi-features-1/1.0/conf/core"],
+    ),
+    "ogcapi-processes-1.0": PreflightRule(
+        conformance_classes=[
+            "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/core"],
+    ),
+    "ogcapi-edr10": PreflightRule(
+        conformance_classes=[
+            "http://www.opengis.net/spec/ogcapi-edr-1/1.0/conf/core"],
+    ),
+    "ogcapi-tiles-1.0": PreflightRule(
+        conformance_classes=[
+            "http://www.opengis.net/spec/ogcapi-tiles-1/1.0/conf/core"],
+    ),
+}
 
 
 class TeamEngineRunnerSettings(BaseSettings):
@@ -21,12 +77,118 @@ class TeamEngineRunnerSettings(BaseSettings):
     default_markdown_serializer: str = "ogc_cite_action.serializers.simple.to_markdown"
     default_parser: str = "ogc_cite_action.parsers.earl.parse_test_suite_result"
     extra_templates_path: str | None = None
+    network: NetworkSettings = NetworkSettings()
 
-    # ogcapi_features_1_0_parser: str = (
-    #     "ogc_cite_action.teamengine_runner.parse_test_suite_result")
-    # ogcapi_features_1_0_markdown_serializer: str = (
-    #     "ogc_cite_action.teamengine_runner.serialize_test_suite_result")
+    # custom parsers and serializers, keyed by test suite identifier. Example:
+    # TEAMENGINE_RUNNER__SUITE_SERIALIZERS='{"ogcapi-features-1.0": {"markdown": "mypackage.to_markdown"}}'
+    suite_parsers: dict[str, str] = {}
+    suite_serializers: dict[str, dict[models.ParseableOutputFormat, str]] = {}
     simple_serializer_template: str = "test-suite-result.md"
+    jinja_bytecode_cache_enabled: bool = True
+    # defaults to $XDG_CACHE_HOME/ogc-cite-action/jinja
+    jinja_bytecode_cache_dir: str | None = None
+    jinja_bytecode_cache_max_size_bytes: int = 10 * 1024 * 1024
+    # directory with templates that have been precompiled with the
+    # `compile-templates` command. If not set, precompiled templates that have
+    # been shipped with the package are used, when available. Either way,
+    # precompiled templates whose source has changed since are ignored
+    precompiled_templates_path: str | None = None
+    use_packaged_precompiled_templates: bool = True
+    # how many rendered conformance class sections of reports are cached, so
+    # that re-rendering a mostly unchanged result only renders what changed.
+    # Disabled when 0, as hashing a conformance class costs about as much as
+    # rendering it
+    fragment_cache_size: int = 0
+    # when set, cached fragments are also kept in this directory
+    fragment_cache_dir: str | None = None
+    fragment_cache_dir_max_size_bytes: int = 50 * 1024 * 1024
+    # when set, parsed results are also stored in this SQLite database
+    results_store_path: str | None = None
+    # when set, raw results of executed suites are added to this archive
+    archive_path: str | None = None
+    # large EARL documents are split and parsed by this many processes
+    parse_workers: int = 1
+    # conformance classes that decide which suites and inputs are worth
+    # running, keyed by test suite identifier (or a prefix of it)
+    preflight_rules: dict[str, PreflightRule] = DEFAULT_PREFLIGHT_RULES
+    # how long the IUT's landing page and conformance document are reused
+    preflight_cache_seconds: float = 300
+
+    # (id of the owning settings, plugin registry), see `plugins.get_registry()`
+    _plugin_registry: tuple[int, typing.Any] | None = pydantic.PrivateAttr(
+        default=None)
+
+
+class SizeLimitedBytecodeCache(jinja2.FileSystemBytecodeCache):
+    """Filesystem bytecode cache which evicts the oldest entries when full."""
+
+    def __init__(self, directory: str, max_size_bytes: int):
+        super().__init__(directory)
+        self.max_size_bytes = max_size_bytes
+
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        super().dump_bytecode(bucket)
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = []
+        for entry in Path(self.directory).glob(self.pattern % ("*",)):
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat_result.st_mtime, stat_result.st_size, entry))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            logger.debug(f"Evicting {entry} from jinja bytecode cache")
+            entry.unlink(missing_ok=True)
+            total_size -= size
+
+
+class ChecksummedModuleLoader(jinja2.ModuleLoader):
+    """Loads precompiled templates, unless their source has changed since.
+
+    `compile_templates()` stores a checksum of each template's source next
+    to the compiled modules. A compiled module whose checksum does not match
+    the current source is ignored, which lets the source loaders that come
+    after this one in a `jinja2.ChoiceLoader` compile the template instead.
+    """
+
+    has_source_access = True
+
+    def __init__(self, path: Path, source_loader: jinja2.BaseLoader):
+        super().__init__(path)
+        self.source_loader = source_loader
+        try:
+            self.checksums: dict[str, str] = json.loads(
+                (path / PRECOMPILED_TEMPLATES_CHECKSUMS_FILE_NAME).read_text())
+        except (OSError, ValueError):
+            logger.warning(
+                f"Precompiled templates in {str(path)!r} have no checksums - "
+                f"they will not be used"
+            )
+            self.checksums = {}
+
+    def get_source(
+            self,
+            environment: jinja2.Environment,
+            template: str,
+    ) -> tuple[str, str | None, typing.Callable[[], bool] | None]:
+        return self.source_loader.get_source(environment, template)
+
+    def load(
+            self,
+            environment: jinja2.Environment,
+            name: str,
+            globals: typing.MutableMapping[str, typing.Any] | None = None,
+    ) -> jinja2.Template:
+        source = self.source_loader.get_source(environment, name)[0]
+        if _get_checksum(source) != self.checksums.get(name):
+            logger.debug(f"Precompiled template {name!r} is stale - ignoring it")
+            raise jinja2.TemplateNotFound(name)
+        return super().load(environment, name, globals)
 
 
 class CliContext(pydantic.BaseModel):
@@ -57,24 +219,117 @@ def get_context(
     )
 
 
-def _get_jinja_environment(settings: TeamEngineRunnerSettings) -> jinja2.Environment:
+def _get_jinja_environment(
+        settings: TeamEngineRunnerSettings,
+        use_precompiled_templates: bool = True,
+) -> jinja2.Environment:
     loaders = [
         jinja2.PackageLoader("ogc_cite_action", "templates"),
     ]
     if settings.extra_templates_path is not None:
         loaders.append(jinja2.FileSystemLoader(settings.extra_templates_path))
+    if use_precompiled_templates and (
+            precompiled_path := _get_precompiled_templates_path(settings)
+    ) is not None:
+        logger.debug(f"Using precompiled templates from {precompiled_path}")
+        loaders.insert(
+            0,
+            ChecksummedModuleLoader(
+                precompiled_path, jinja2.ChoiceLoader(list(loaders)))
+        )
     env = jinja2.Environment(
         loader=jinja2.ChoiceLoader(loaders),
         extensions=[
             "jinja2_humanize_extension.HumanizeExtension",
         ],
+        bytecode_cache=_get_jinja_bytecode_cache(settings),
     )
     env.globals.update({
         "TestStatus": models.TestStatus,
+        "render_fragment": fragments.FragmentRenderer(
+            env, _get_fragment_cache(settings)),
     })
     return env
 
 
+def compile_templates(
+        settings: TeamEngineRunnerSettings,
+        target: Path,
+) -> Path:
+    """Precompile all known templates into python modules.
+
+    The generated modules are loaded with `ChecksummedModuleLoader`, which
+    means rendering them does not need any lexing/parsing/compilation, for
+    as long as the source of each template stays the same.
+    """
+    env = _get_jinja_environment(settings, use_precompiled_templates=False)
+    env.compile_templates(str(target), zip=None, ignore_errors=False)
+    checksums = {
+        name: _get_checksum(env.loader.get_source(env, name)[0])
+        for name in env.list_templates()
+    }
+    (target / PRECOMPILED_TEMPLATES_CHECKSUMS_FILE_NAME).write_text(
+        json.dumps(checksums, indent=2, sort_keys=True))
+    return target
+
+
+def _get_precompiled_templates_path(
+        settings: TeamEngineRunnerSettings
+) -> Path | None:
+    if settings.precompiled_templates_path is not None:
+        return Path(settings.precompiled_templates_path)
+    if (
+            settings.use_packaged_precompiled_templates
+            and PACKAGED_PRECOMPILED_TEMPLATES_PATH.is_dir()
+    ):
+        return PACKAGED_PRECOMPILED_TEMPLATES_PATH
+    return None
+
+
+def _get_checksum(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _get_fragment_cache(
+        settings: TeamEngineRunnerSettings
+) -> fragments.FragmentCache | None:
+    if settings.fragment_cache_size <= 0 and settings.fragment_cache_dir is None:
+        return None
+    try:
+        return fragments.FragmentCache(
+            settings.fragment_cache_size,
+            settings.fragment_cache_dir,
+            settings.fragment_cache_dir_max_size_bytes,
+        )
+    except OSError:
+        logger.warning(
+            f"Could not create fragment cache dir "
+            f"{settings.fragment_cache_dir!r} - fragments will not be cached"
+        )
+        return None
+
+
+def _get_jinja_bytecode_cache(
+        settings: TeamEngineRunnerSettings
+) -> jinja2.BytecodeCache | None:
+    if not settings.jinja_bytecode_cache_enabled:
+        return None
+    if (cache_dir := settings.jinja_bytecode_cache_dir) is None:
+        cache_home = os.environ.get(
+            "XDG_CACHE_HOME", Path.home() / ".cache")
+        cache_dir = Path(cache_home) / "ogc-cite-action" / "jinja"
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    except OSError:
+        logger.warning(
+            f"Could not create jinja bytecode cache dir {str(cache_dir)!r} - "
+            f"templates will not be cached"
+        )
+        return None
+    return SizeLimitedBytecodeCache(
+        str(cache_dir), settings.jinja_bytecode_cache_max_size_bytes)
+
+
 def configure_logging(
         debug: bool
 ) -> None:
@@ -0,0 +1,336 @@
+"""Long-running service which parses, serializes and executes test suites.
+
+The daemon exposes a small HTTP API, either over TCP or over a Unix socket:
+
+- `GET /health` - status of the daemon and its job queue
+- `POST /parse` - parse the raw teamengine result that is sent as the request
+  body and return it serialized. Accepts the `output_format` and
+  `treat_skipped_tests_as_failures` query parameters
+- `POST /serialize` - serialize the `TestSuiteResult` JSON document that is
+  sent as the request body. Accepts the `output_format` query parameter
+- `POST /execute` - execute a test suite. The request body is a JSON
+  document with the same parameters as the `execute-test-suite-standalone`
+  command (see `ExecuteRequest`)
+
+Unlike regular CLI invocations, the daemon keeps its HTTP connection pool,
+jinja environment, plugin registry and parsed results around between
+requests. Jobs are run by a fixed number of worker threads and are taken from
+a bounded queue - when the queue is full, new requests are rejected with a
+`503 Service Unavailable` response.
+"""
+
+import collections
+import concurrent.futures
+import hashlib
+import http.server
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import typing
+import urllib.parse
+
+import httpx
+import pydantic
+
+from . import (
+    config,
+    exceptions,
+    models,
+    plugins,
+    teamengine_runner,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    ...
+
+
+class ExecuteRequest(pydantic.BaseModel):
+    teamengine_base_url: str
+    test_suite_identifier: str
+    test_suite_inputs: dict[str, list[str]] = {}
+    teamengine_username: pydantic.SecretStr = pydantic.SecretStr("ogctest")
+    teamengine_password: pydantic.SecretStr = pydantic.SecretStr("ogctest")
+    output_format: models.ParseableOutputFormat = models.ParseableOutputFormat.JSON
+    treat_skipped_tests_as_failures: bool = True
+
+
+class JobQueue:
+    """Bounded job queue which is consumed by a fixed pool of worker threads."""
+
+    def __init__(self, num_workers: int, max_queued_jobs: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_jobs)
+        self._workers = [
+            threading.Thread(
+                target=self._work, name=f"daemon-worker-{index}", daemon=True)
+            for index in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def num_workers(self) -> int:
+        return len(self._workers)
+
+    @property
+    def num_queued_jobs(self) -> int:
+        return self._queue.qsize()
+
+    def submit(
+            self,
+            func: typing.Callable,
+            *args,
+            **kwargs
+    ) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        try:
+            self._queue.put_nowait((future, func, args, kwargs))
+        except queue.Full as exc:
+            raise QueueFullError("Job queue is full") from exc
+        return future
+
+    def shutdown(self) -> None:
+        for _ in self._workers:
+            self._queue.put((None, None, None, None))
+        for worker in self._workers:
+            worker.join()
+
+    def _work(self) -> None:
+        while True:
+            future, func, args, kwargs = self._queue.get()
+            if future is None:
+                break
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as exc:
+                    future.set_exception(exc)
+
+
+class LruCache:
+    """Thread-safe mapping which discards its least recently used items."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: typing.Hashable) -> typing.Any | None:
+        with self._lock:
+            if (value := self._items.get(key)) is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: typing.Hashable, value: typing.Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class Daemon:
+    """Warm state that is shared by all jobs submitted to the daemon."""
+
+    def __init__(
+            self,
+            context: config.CliContext,
+            num_workers: int = 4,
+            max_queued_jobs: int = 100,
+            result_cache_size: int = 128,
+    ):
+        self.context = context
+        self.registry = plugins.get_registry(context.settings)
+        self.http_client = teamengine_runner.get_http_client(
+            context.settings.network, context.network_timeout_seconds)
+        self.parsed_results = LruCache(result_cache_size)
+        self.serialized_results = LruCache(result_cache_size)
+        self.jobs = JobQueue(num_workers, max_queued_jobs)
+
+    def close(self) -> None:
+        self.jobs.shutdown()
+        self.http_client.close()
+
+    def get_health(self) -> dict:
+        return {
+            "status": "ok",
+            "workers": self.jobs.num_workers,
+            "queued_jobs": self.jobs.num_queued_jobs,
+            "cached_results": len(self.parsed_results),
+        }
+
+    def parse(
+            self,
+            raw_result: bytes,
+            output_format: models.ParseableOutputFormat,
+            treat_skipped_tests_as_failures: bool,
+            test_suite_identifier: str | None = None,
+    ) -> str:
+        digest = hashlib.sha256(raw_result).hexdigest()
+        # the suite picks the parser, so it is part of the keys
+        parsed_key = (digest, treat_skipped_tests_as_failures, test_suite_identifier)
+        serialized_key = (*parsed_key, output_format)
+        if (serialized := self.serialized_results.get(serialized_key)) is None:
+            if (parsed := self.parsed_results.get(parsed_key)) is None:
+                try:
+                    parsed = teamengine_runner.parse_test_suite_result(
+                        raw_result,
+                        self.context.settings,
+                        treat_skipped_tests_as_failures,
+                        test_suite_identifier=test_suite_identifier,
+                    )
+                except Exception as exc:
+                    # parsers may fail in any way on XML which is not the
+                    # kind of document they expect
+                    raise exceptions.OgcCiteActionException(
+                        f"Could not parse test suite result: {exc}") from exc
+                self.parsed_results.set(parsed_key, parsed)
+            serialized = self.serialize(parsed, output_format)
+            self.serialized_results.set(serialized_key, serialized)
+        return serialized
+
+    def serialize(
+            self,
+            parsed: models.TestSuiteResult,
+            output_format: models.ParseableOutputFormat,
+    ) -> str:
+        return teamengine_runner.serialize_suite_result(
+            parsed,
+            output_format,
+            self.context.settings,
+            self.context.jinja_environment
+        )
+
+    def execute(self, request: ExecuteRequest) -> str:
+        raw_result = teamengine_runner.run_test_suite(
+            self.http_client,
+            request.teamengine_base_url,
+            request.test_suite_identifier,
+            test_suite_arguments=request.test_suite_inputs,
+            teamengine_username=request.teamengine_username,
+            teamengine_password=request.teamengine_password,
+        )
+        return self.parse(
+            raw_result,
+            request.output_format,
+            request.treat_skipped_tests_as_failures,
+            test_suite_identifier=request.test_suite_identifier,
+        )
+
+
+class DaemonRequestHandler(http.server.BaseHTTPRequestHandler):
+    server: "DaemonHttpServer | DaemonUnixHttpServer"
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == "/health":
+            self._respond(
+                200, json.dumps(self.server.daemon.get_health()), "application/json")
+        else:
+            self._respond_error(404, "Not found")
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        daemon = self.server.daemon
+        try:
+            output_format = models.ParseableOutputFormat(
+                query.get("output_format", ["json"])[0])
+            if url.path == "/parse":
+                future = daemon.jobs.submit(
+                    daemon.parse,
+                    body,
+                    output_format,
+                    query.get(
+                        "treat_skipped_tests_as_failures", ["true"]
+                    )[0].lower() == "true",
+                )
+            elif url.path == "/serialize":
+                future = daemon.jobs.submit(
+                    daemon.serialize,
+                    models.TestSuiteResult.model_validate_json(body),
+                    output_format,
+                )
+            elif url.path == "/execute":
+                execute_request = ExecuteRequest.model_validate_json(body)
+                output_format = execute_request.output_format
+                future = daemon.jobs.submit(daemon.execute, execute_request)
+            else:
+                self._respond_error(404, "Not found")
+                return
+            result = future.result()
+        except QueueFullError:
+            self._respond_error(503, "Job queue is full, try again later")
+        except (ValueError, pydantic.ValidationError) as exc:
+            self._respond_error(400, str(exc))
+        except (exceptions.OgcCiteActionException, httpx.HTTPError) as exc:
+            logger.warning(f"Could not process job: {exc}")
+            # failures to execute are teamengine's fault, others are ours
+            self._respond_error(502 if url.path == "/execute" else 400, str(exc))
+        except Exception:
+            logger.exception(f"Unexpected error processing {url.path!r} job")
+            self._respond_error(500, "Internal server error")
+        else:
+            self._respond(
+                200,
+                result,
+                "application/json"
+                if output_format == models.ParseableOutputFormat.JSON
+                else "text/markdown; charset=utf-8"
+            )
+
+    def address_string(self) -> str:
+        # unix sockets do not have a client address
+        return self.client_address[0] if self.client_address else "unix-socket"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} - {format % args}")
+
+    def _respond_error(self, status_code: int, message: str) -> None:
+        self._respond(
+            status_code, json.dumps({"detail": message}), "application/json")
+
+    def _respond(self, status_code: int, content: str, media_type: str) -> None:
+        encoded = content.encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+class DaemonHttpServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], daemon: Daemon):
+        self.daemon = daemon
+        super().__init__(address, DaemonRequestHandler)
+
+
+class DaemonUnixHttpServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon: Daemon):
+        self.daemon = daemon
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, DaemonRequestHandler)
+
+
+def get_server(
+        daemon: Daemon,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: str | None = None,
+) -> DaemonHttpServer | DaemonUnixHttpServer:
+    if unix_socket is not None:
+        return DaemonUnixHttpServer(unix_socket, daemon)
+    return DaemonHttpServer((host, port), daemon)
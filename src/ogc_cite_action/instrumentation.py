@@ -0,0 +1,141 @@
+"""Timing and memory instrumentation of the various processing phases.
+
+Code that wants to be measured wraps its work in the `phase()` context
+manager. This is a no-op unless a `MetricsRecorder` has been activated, which
+is what the CLI does when it is called with the `--metrics` or `--profile`
+options.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import logging
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Generator
+
+import pydantic
+
+logger = logging.getLogger(__name__)
+
+_current_recorder: contextvars.ContextVar["MetricsRecorder | None"] = (
+    contextvars.ContextVar("current_recorder", default=None))
+
+
+class PhaseMetrics(pydantic.BaseModel):
+    name: str
+    duration_seconds: float
+    peak_memory_bytes: int | None = None
+
+
+class RunMetrics(pydantic.BaseModel):
+    command: str | None
+    duration_seconds: float
+    peak_memory_bytes: int | None = None
+    phases: list[PhaseMetrics]
+
+
+class MetricsRecorder:
+    """Collects metrics for the phases that run while it is active.
+
+    Durations are measured with a monotonic clock. When `trace_memory` is
+    enabled, each phase also records the peak of memory allocated while it was
+    running, as reported by `tracemalloc`. When `profile` is enabled, phases
+    that are marked as being profileable are also run under `cProfile`.
+    """
+
+    def __init__(
+            self,
+            command: str | None = None,
+            trace_memory: bool = True,
+            profile: bool = False,
+    ):
+        self.command = command
+        self.trace_memory = trace_memory
+        self.profiler = cProfile.Profile() if profile else None
+        self.phases: list[PhaseMetrics] = []
+        self._peaks_stack: list[int] = []
+        self._start = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(
+            self,
+            name: str,
+            profile: bool = False,
+    ) -> Generator[None, None, None]:
+        if self.trace_memory:
+            # tracemalloc only keeps a single peak value, so we stash the
+            # enclosing phase's peak before resetting it for this one
+            if self._peaks_stack:
+                self._peaks_stack[-1] = max(
+                    self._peaks_stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks_stack.append(0)
+        profiler = self.profiler if profile else None
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            peak = None
+            if self.trace_memory:
+                peak = max(
+                    self._peaks_stack.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks_stack:
+                    self._peaks_stack[-1] = max(self._peaks_stack[-1], peak)
+            self.phases.append(
+                PhaseMetrics(
+                    name=name,
+                    duration_seconds=duration,
+                    peak_memory_bytes=peak,
+                )
+            )
+            logger.debug(f"phase {name!r} took {duration:.3f}s")
+
+    def get_metrics(self) -> RunMetrics:
+        peak = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            for phase_metrics in self.phases:
+                peak = max(peak, phase_metrics.peak_memory_bytes or 0)
+        return RunMetrics(
+            command=self.command,
+            duration_seconds=time.perf_counter() - self._start,
+            peak_memory_bytes=peak,
+            phases=self.phases,
+        )
+
+    def dump_profile(self, target: Path) -> None:
+        if self.profiler is not None:
+            self.profiler.dump_stats(target)
+
+
+@contextlib.contextmanager
+def recording(recorder: MetricsRecorder) -> Generator[MetricsRecorder, None, None]:
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def activate(recorder: MetricsRecorder) -> None:
+    """Make the input recorder the active one for the current context."""
+    _current_recorder.set(recorder)
+
+
+@contextlib.contextmanager
+def phase(name: str, profile: bool = False) -> Generator[None, None, None]:
+    """Measure the enclosed code as a named phase of the active recorder."""
+    if (recorder := _current_recorder.get()) is None:
+        yield
+    else:
+        with recorder.phase(name, profile=profile):
+            yield
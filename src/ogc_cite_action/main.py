@@ -2,6 +2,8 @@
 
 from builtins import print as stdlib_print
 import logging
+import sys
+import time
 import typing
 from pathlib import Path
 
@@ -10,17 +12,31 @@ import httpx
 import pydantic
 import typer
 from rich import print
+from rich.markup import escape
+from rich.table import Table
 
-import src.ogc_cite_action.config
 from . import (
+    archive,
     config,
+    compression,
+    daemon,
     exceptions,
+    instrumentation,
     models,
+    plugins,
+    preflight,
+    results_store,
     teamengine_runner,
+    watch,
 )
+from .serializers import columnar
 
 logger = logging.getLogger(__name__)
 app = typer.Typer()
+query_app = typer.Typer(help="Query the results store.")
+app.add_typer(query_app, name="query")
+archive_app = typer.Typer(help="Deduplicating archive of raw results.")
+app.add_typer(archive_app, name="archive")
 
 
 def _parse_pydantic_secret_str(value: str) -> pydantic.SecretStr:
@@ -37,6 +53,27 @@ _teamengine_base_url_argument = typing.Annotated[
         help="Base URL of teamengine service. Ex: http://localhost:8080/teamengine"
     )
 ]
+_raw_output_path_option = typing.Annotated[
+    typing.Optional[Path],
+    typer.Option(
+        dir_okay=False,
+        help=(
+            "Also write the raw result, as returned by teamengine, to this "
+            "path. The result is compressed if the path ends with .gz, .zst "
+            "or .xz"
+        )
+    )
+]
+_preflight_option = typing.Annotated[
+    bool,
+    typer.Option(
+        "--preflight/--no-preflight",
+        help=(
+            "Probe the IUT's conformance classes first and skip the test suite "
+            "if it would not test anything the IUT declares"
+        )
+    )
+]
 _teamengine_username_option = typing.Annotated[
     pydantic.SecretStr,
     typer.Option(
@@ -57,13 +94,49 @@ _teamengine_password_option = typing.Annotated[
 def base_callback(
     ctx: typer.Context,
     debug: bool = False,
-    network_timeout: int = 120
+    network_timeout: int = 120,
+    metrics: typing.Annotated[
+        typing.Optional[str],
+        typer.Option(
+            help=(
+                "Record timing and memory metrics for each processing phase "
+                "and write them as JSON to this path. Use '-' to write them "
+                "to stderr instead"
+            )
+        )
+    ] = None,
+    profile: typing.Annotated[
+        typing.Optional[Path],
+        typer.Option(
+            dir_okay=False,
+            help=(
+                "Write cProfile stats for the parsing and serialization "
+                "phases to this path"
+            )
+        )
+    ] = None,
 ) -> None:
     config.configure_logging(debug=debug)
     ctx.obj = config.get_context(
         debug=debug,
         network_timeout_seconds=network_timeout,
     )
+    # list-plugins loads plugins leniently, in order to report broken ones
+    if ctx.invoked_subcommand != "list-plugins":
+        try:
+            plugins.get_registry(ctx.obj.settings)
+        except exceptions.OgcCiteActionException as exc:
+            logger.critical(f"Invalid parser/serializer configuration: {exc}")
+            raise typer.Exit(1)
+    if metrics is not None or profile is not None:
+        recorder = instrumentation.MetricsRecorder(
+            command=ctx.invoked_subcommand,
+            trace_memory=metrics is not None,
+            profile=profile is not None,
+        )
+        instrumentation.activate(recorder)
+        ctx.call_on_close(
+            lambda: _write_metrics(recorder, metrics, profile))
 
 
 @app.command("parse-result")
@@ -81,12 +154,24 @@ def parse_test_result(
         output_format: models.ParseableOutputFormat = models.ParseableOutputFormat.JSON,
         treat_skipped_tests_as_failures: bool = True,
         exit_with_error_on_suite_failed_result: bool = False,
+        parse_workers: typing.Annotated[
+            typing.Optional[int],
+            typer.Option(
+                min=1,
+                help=(
+                    "Number of processes used for parsing large results. "
+                    "Defaults to the parse_workers setting"
+                )
+            )
+        ] = None,
 ):
     parsed = teamengine_runner.parse_test_suite_result(
-        test_suite_result.read_text(),
+        test_suite_result,
         ctx.obj.settings,
-        treat_skipped_tests_as_failures
+        treat_skipped_tests_as_failures,
+        num_workers=parse_workers,
     )
+    _store_results(ctx.obj.settings, parsed)
     serialized = teamengine_runner.serialize_suite_result(
         parsed, output_format, ctx.obj.settings, ctx.obj.jinja_environment
     )
@@ -95,6 +180,472 @@ def parse_test_result(
         _get_exit_code(parsed, exit_with_error_on_suite_failed_result))
 
 
+_results_store_option = typing.Annotated[
+    typing.Optional[Path],
+    typer.Option(
+        dir_okay=False,
+        help=(
+            "Path to the SQLite results store. Defaults to the "
+            "results_store_path setting"
+        )
+    )
+]
+
+
+@app.command("ingest")
+def ingest_results(
+        ctx: typer.Context,
+        test_suite_results: typing.Annotated[
+            list[Path],
+            typer.Argument(
+                exists=True,
+                dir_okay=False,
+                help="Suite execution results (possibly compressed)"
+            )
+        ],
+        results_store_path: _results_store_option = None,
+        treat_skipped_tests_as_failures: bool = True,
+):
+    """Parse raw suite execution results and add them to the results store."""
+    parsed_results = [
+        teamengine_runner.parse_test_suite_result(
+            test_suite_result,
+            ctx.obj.settings,
+            treat_skipped_tests_as_failures
+        ) for test_suite_result in test_suite_results
+    ]
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        run_ids = store.ingest(*parsed_results)
+    print(f"Stored {len(run_ids)} new run(s)")
+
+
+@query_app.command("runs")
+def query_runs(
+        ctx: typer.Context,
+        suite: typing.Optional[str] = None,
+        iut: typing.Optional[str] = None,
+        limit: int = 20,
+        results_store_path: _results_store_option = None,
+):
+    """List the most recent runs."""
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        runs = store.list_runs(suite_title=suite, iut=iut, limit=limit)
+    table = Table(
+        "id", "started", "suite", "IUT", "passed", "failed", "skipped", "passes")
+    for run in runs:
+        table.add_row(
+            str(run.id),
+            run.test_run_start.isoformat(),
+            run.suite_title,
+            escape(run.iut or ""),
+            "yes" if run.passed else "no",
+            str(run.num_failed_tests),
+            str(run.num_skipped_tests),
+            str(run.num_passed_tests),
+        )
+    print(table)
+
+
+@query_app.command("history")
+def query_history(
+        ctx: typer.Context,
+        test_case_identifier: str,
+        suite: typing.Optional[str] = None,
+        iut: typing.Optional[str] = None,
+        limit: int = 20,
+        results_store_path: _results_store_option = None,
+):
+    """Show the most recent results of a test case."""
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        occurrences = store.get_history(
+            test_case_identifier, suite_title=suite, iut=iut, limit=limit)
+    print(_render_occurrences(occurrences))
+
+
+@query_app.command("last-failure")
+def query_last_failure(
+        ctx: typer.Context,
+        test_case_identifier: str,
+        suite: typing.Optional[str] = None,
+        iut: typing.Optional[str] = None,
+        results_store_path: _results_store_option = None,
+):
+    """Show when a test case last failed."""
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        occurrence = store.get_last_failure(
+            test_case_identifier, suite_title=suite, iut=iut)
+    print(
+        _render_occurrences([occurrence]) if occurrence is not None
+        else "Test case has never failed"
+    )
+
+
+@query_app.command("failing-since")
+def query_failing_since(
+        ctx: typer.Context,
+        test_case_identifier: str,
+        suite: typing.Optional[str] = None,
+        iut: typing.Optional[str] = None,
+        results_store_path: _results_store_option = None,
+):
+    """Show when a test case started failing."""
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        occurrence = store.get_failing_since(
+            test_case_identifier, suite_title=suite, iut=iut)
+    print(
+        _render_occurrences([occurrence]) if occurrence is not None
+        else "Test case is not currently failing"
+    )
+
+
+@query_app.command("flaky")
+def query_flaky(
+        ctx: typer.Context,
+        suite: typing.Optional[str] = None,
+        iut: typing.Optional[str] = None,
+        num_recent_runs: int = 20,
+        min_status_changes: int = 2,
+        results_store_path: _results_store_option = None,
+):
+    """List test cases whose status keeps changing between recent runs."""
+    with _get_results_store(ctx.obj.settings, results_store_path) as store:
+        flaky = store.get_flaky_test_cases(
+            suite_title=suite,
+            iut=iut,
+            num_recent_runs=num_recent_runs,
+            min_status_changes=min_status_changes,
+        )
+    table = Table("test case", "suite", "IUT", "runs", "status changes", "failures")
+    for test_case in flaky:
+        table.add_row(
+            escape(test_case.identifier),
+            test_case.suite_title,
+            escape(test_case.iut or ""),
+            str(test_case.num_runs),
+            str(test_case.num_status_changes),
+            str(test_case.num_failures),
+        )
+    print(table)
+
+
+_archive_path_option = typing.Annotated[
+    typing.Optional[Path],
+    typer.Option(
+        dir_okay=False,
+        help="Path to the archive. Defaults to the archive_path setting"
+    )
+]
+
+
+@archive_app.command("add")
+def archive_add(
+        ctx: typer.Context,
+        test_suite_results: typing.Annotated[
+            list[Path],
+            typer.Argument(
+                exists=True,
+                dir_okay=False,
+                help="Raw suite execution results (possibly compressed)"
+            )
+        ],
+        archive_path: _archive_path_option = None,
+):
+    """Add raw suite execution results to the archive."""
+    with _get_archive(ctx.obj.settings, archive_path) as archive_:
+        for test_suite_result in test_suite_results:
+            with compression.open_raw_result(test_suite_result) as fh:
+                run = archive_.add(fh.read(), test_suite_result.name)
+            print(f"{test_suite_result} archived as run {run.id}")
+        stats = archive_.get_stats()
+    print(
+        f"Archive holds {stats.num_runs} run(s) of {stats.raw_size} bytes in "
+        f"{stats.stored_size} bytes"
+    )
+
+
+@archive_app.command("list")
+def archive_list(
+        ctx: typer.Context,
+        archive_path: _archive_path_option = None,
+        limit: int = 20,
+):
+    """List the most recently archived runs."""
+    with _get_archive(ctx.obj.settings, archive_path) as archive_:
+        runs = archive_.list_runs(limit=limit)
+    table = Table("id", "name", "archived", "size", "chunks")
+    for run in runs:
+        table.add_row(
+            str(run.id),
+            run.name,
+            run.archived_at.isoformat(),
+            str(run.size),
+            str(run.num_chunks),
+        )
+    print(table)
+
+
+@archive_app.command("stats")
+def archive_stats(
+        ctx: typer.Context,
+        archive_path: _archive_path_option = None,
+):
+    """Show how much storage the archive saves."""
+    with _get_archive(ctx.obj.settings, archive_path) as archive_:
+        stats = archive_.get_stats()
+    table = Table("runs", "chunks", "packs", "raw size", "stored size", "ratio")
+    table.add_row(
+        str(stats.num_runs),
+        str(stats.num_chunks),
+        str(stats.num_packs),
+        str(stats.raw_size),
+        str(stats.stored_size),
+        f"{stats.stored_size / stats.raw_size:.2%}" if stats.raw_size else "",
+    )
+    print(table)
+
+
+@archive_app.command("restore")
+def archive_restore(
+        ctx: typer.Context,
+        run_id: int,
+        output: typing.Annotated[
+            Path,
+            typer.Option(
+                dir_okay=False,
+                help=(
+                    "Where to write the raw result. It is compressed if the "
+                    "path ends with .gz, .zst or .xz"
+                )
+            )
+        ],
+        archive_path: _archive_path_option = None,
+):
+    """Restore an archived raw result, exactly as it was added."""
+    with _get_archive(ctx.obj.settings, archive_path) as archive_:
+        try:
+            restored = archive_.restore(run_id)
+        except exceptions.OgcCiteActionException as err:
+            logger.critical(err)
+            raise typer.Exit(1)
+    with compression.open_raw_result(output, "wb") as fh:
+        fh.write(restored)
+    print(f"Run {run_id} restored to {output}")
+
+
+@archive_app.command("parse")
+def archive_parse(
+        ctx: typer.Context,
+        run_id: int,
+        archive_path: _archive_path_option = None,
+        output_format: models.ParseableOutputFormat = models.ParseableOutputFormat.JSON,
+        treat_skipped_tests_as_failures: bool = True,
+):
+    """Parse an archived raw result, streaming it from the archive."""
+    with _get_archive(ctx.obj.settings, archive_path) as archive_:
+        try:
+            archive_.get_run(run_id)
+            with archive_.open_run(run_id) as fh:
+                parsed = teamengine_runner.parse_test_suite_result(
+                    fh, ctx.obj.settings, treat_skipped_tests_as_failures)
+        except exceptions.OgcCiteActionException as err:
+            logger.critical(err)
+            raise typer.Exit(1)
+    print(
+        teamengine_runner.serialize_suite_result(
+            parsed, output_format, ctx.obj.settings, ctx.obj.jinja_environment
+        )
+    )
+
+
+@app.command("export-columnar")
+def export_columnar(
+        ctx: typer.Context,
+        test_suite_results: typing.Annotated[
+            list[Path],
+            typer.Argument(
+                exists=True,
+                dir_okay=False,
+                help=(
+                    "Suite execution results (possibly compressed), or "
+                    "results that were previously parsed to JSON"
+                )
+            )
+        ],
+        output: typing.Annotated[
+            Path,
+            typer.Option(
+                help=(
+                    "Output file, or dataset directory when using "
+                    "--append-to-dataset"
+                )
+            )
+        ],
+        columnar_format: typing.Annotated[
+            columnar.ColumnarFormat,
+            typer.Option("--format")
+        ] = columnar.ColumnarFormat.PARQUET,
+        append_to_dataset: typing.Annotated[
+            bool,
+            typer.Option(
+                help=(
+                    "Add results to a dataset directory that is partitioned "
+                    "by suite, instead of writing a single file"
+                )
+            )
+        ] = False,
+        treat_skipped_tests_as_failures: bool = True,
+):
+    """Export results as a table with one row per test case."""
+    parsed_results = []
+    for test_suite_result in test_suite_results:
+        if test_suite_result.suffix.lower() == ".json":
+            parsed_results.append(
+                models.TestSuiteResult.model_validate_json(
+                    test_suite_result.read_bytes()))
+        else:
+            parsed_results.append(
+                teamengine_runner.parse_test_suite_result(
+                    test_suite_result,
+                    ctx.obj.settings,
+                    treat_skipped_tests_as_failures
+                )
+            )
+    try:
+        with instrumentation.phase(f"export-{columnar_format.value}"):
+            table = columnar.to_table(*parsed_results)
+            if append_to_dataset:
+                columnar.append_to_dataset(table, output, columnar_format)
+            else:
+                columnar.write_table(table, output, columnar_format)
+    except exceptions.OgcCiteActionException as err:
+        logger.critical(err)
+        raise typer.Exit(1)
+    print(f"Exported {table.num_rows} test case results to {output}")
+
+
+@app.command("preflight")
+def run_preflight(
+        ctx: typer.Context,
+        test_suite_identifiers: typing.Annotated[
+            list[str],
+            typer.Argument(help="Executable test suites that would be run")
+        ],
+        test_suite_input: typing.Annotated[
+            list[click.Tuple],
+            typer.Option(
+                click_type=click.Tuple([str, str]),
+                help=(
+                    "Input name and value separated by a space. Must include "
+                    "the iut. Ex: --test-suite-input iut http://localhost:5000"
+                )
+            )
+        ],
+):
+    """Check which test suites are worth running against an IUT."""
+    suite_inputs = {}
+    for param_name, param_value in test_suite_input:
+        suite_inputs.setdefault(param_name, []).append(param_value)
+    with teamengine_runner.get_http_client(
+            ctx.obj.settings.network, ctx.obj.network_timeout_seconds) as client:
+        report = _run_preflight(
+            client, ctx.obj.settings, test_suite_identifiers, suite_inputs)
+    print(_render_preflight_report(report))
+
+
+@app.command("list-plugins")
+def list_plugins(ctx: typer.Context):
+    """List the parsers and serializers that are available.
+
+    Plugins which cannot be loaded are listed too, along with their error.
+    """
+    registry = plugins.PluginRegistry(ctx.obj.settings, strict=False)
+    table = Table(
+        "kind", "test suite", "output format", "python path", "source", "error")
+    for plugin_info in registry.plugins + registry.errors:
+        table.add_row(
+            plugin_info.kind,
+            plugin_info.test_suite_identifier or "(default)",
+            plugin_info.output_format.value if plugin_info.output_format else "",
+            plugin_info.python_path,
+            plugin_info.source,
+            escape(plugin_info.error or ""),
+        )
+    print(table)
+    if registry.errors:
+        raise typer.Exit(1)
+
+
+@app.command("compile-templates")
+def compile_templates(
+        ctx: typer.Context,
+        target: typing.Annotated[
+            Path,
+            typer.Option(
+                file_okay=False,
+                help=(
+                    "Directory where precompiled templates are to be written. "
+                    "Point TEAMENGINE_RUNNER__PRECOMPILED_TEMPLATES_PATH to it "
+                    "in order to use them, or use the package's "
+                    "templates_compiled directory in a source checkout, in "
+                    "order to ship them with the package"
+                )
+            )
+        ],
+):
+    """Precompile templates into python modules, to speed up rendering.
+
+    Precompiled templates whose source has changed since are ignored.
+    """
+    compiled_path = config.compile_templates(ctx.obj.settings, target)
+    print(f"Templates compiled to {compiled_path}")
+
+
+@app.command("serve")
+def serve(
+        ctx: typer.Context,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: typing.Annotated[
+            typing.Optional[str],
+            typer.Option(help="Listen on this unix socket instead of host:port")
+        ] = None,
+        workers: typing.Annotated[
+            int,
+            typer.Option(min=1, help="Number of jobs that can run concurrently")
+        ] = 4,
+        max_queued_jobs: typing.Annotated[
+            int,
+            typer.Option(
+                min=1,
+                help="Number of pending jobs after which new ones are rejected"
+            )
+        ] = 100,
+        result_cache_size: typing.Annotated[
+            int,
+            typer.Option(min=1, help="Number of parsed results to keep cached")
+        ] = 128,
+):
+    """Run as a daemon, exposing parse, serialize and execute over HTTP."""
+    daemon_ = daemon.Daemon(
+        ctx.obj,
+        num_workers=workers,
+        max_queued_jobs=max_queued_jobs,
+        result_cache_size=result_cache_size,
+    )
+    server = daemon.get_server(daemon_, host, port, unix_socket)
+    logger.warning(
+        f"Listening on {unix_socket or f'http://{host}:{port}'} - press "
+        f"Ctrl+C to stop"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.warning("Stopping...")
+    finally:
+        server.server_close()
+        daemon_.close()
+
+
 @app.command("execute-test-suite")
 def execute_test_suite_from_github_actions(
     ctx: typer.Context,
@@ -115,6 +666,8 @@ def execute_test_suite_from_github_actions(
     treat_skipped_tests_as_failures: bool = True,
     exit_with_error_on_suite_failed_result: bool = False,
     output_format: models.OutputFormat = models.OutputFormat.MARKDOWN,
+    raw_output_path: _raw_output_path_option = None,
+    run_preflight_checks: _preflight_option = False,
 ):
     """Execute a CITE test suite via github actions.
 
@@ -136,6 +689,8 @@ def execute_test_suite_from_github_actions(
         test_suite_inputs=suite_inputs,
         output_format=output_format,
         treat_skipped_tests_as_failures=treat_skipped_tests_as_failures,
+        raw_output_path=raw_output_path,
+        run_preflight_checks=run_preflight_checks,
     )
     logger.debug(f"{parsed.passed=}")
     if output_format == models.OutputFormat.RAW:
@@ -165,6 +720,8 @@ def execute_test_suite_standalone(
     output_format: models.OutputFormat = models.OutputFormat.MARKDOWN,
     treat_skipped_tests_as_failures: bool = True,
     exit_with_error_on_suite_failed_result: bool = False,
+    raw_output_path: _raw_output_path_option = None,
+    run_preflight_checks: _preflight_option = False,
 ):
     """Execute a CITE test suite."""
     suite_inputs = {}
@@ -180,6 +737,8 @@ def execute_test_suite_standalone(
         test_suite_inputs=suite_inputs,
         output_format=output_format,
         treat_skipped_tests_as_failures=treat_skipped_tests_as_failures,
+        raw_output_path=raw_output_path,
+        run_preflight_checks=run_preflight_checks,
     )
     if output_format == models.OutputFormat.RAW:
         logger.debug(
@@ -190,8 +749,87 @@ def execute_test_suite_standalone(
     raise typer.Exit(_get_exit_code(parsed, exit_with_error_on_suite_failed_result))
 
 
+@app.command("watch")
+def watch_iut(
+    ctx: typer.Context,
+    teamengine_base_url: _teamengine_base_url_argument,
+    test_suite_identifier: _test_suite_identifier_argument,
+    test_suite_input: typing.Annotated[
+        list[click.Tuple],
+        typer.Option(
+            click_type=click.Tuple([str, str]),
+            help=(
+                "Input name and value separated by a space. Must include "
+                "the iut. Ex: --test-suite-input iut http://localhost:5000"
+            )
+        )
+    ],
+    teamengine_username: _teamengine_username_option = "ogctest",
+    teamengine_password: _teamengine_password_option = "ogctest",
+    treat_skipped_tests_as_failures: bool = True,
+    interval: typing.Annotated[
+        float,
+        typer.Option(
+            min=1, help="Seconds to wait between checks of the IUT")
+    ] = 60,
+    max_runs: typing.Annotated[
+        typing.Optional[int],
+        typer.Option(
+            min=1,
+            help="Stop after executing the test suite this many times"
+        )
+    ] = None,
+):
+    """Re-execute a test suite whenever the IUT changes, printing status changes.
+
+    The IUT's landing page, conformance and OpenAPI documents are polled with
+    conditional requests and the test suite only runs when they change.
+    """
+    suite_inputs = {}
+    for param_name, param_value in test_suite_input:
+        suite_inputs.setdefault(param_name, []).append(param_value)
+    num_runs = 0
+    with teamengine_runner.get_http_client(
+            ctx.obj.settings.network, ctx.obj.network_timeout_seconds) as client:
+        try:
+            watcher = watch.Watcher(
+                client,
+                ctx.obj.settings,
+                teamengine_base_url,
+                test_suite_identifier,
+                suite_inputs,
+                teamengine_username=teamengine_username,
+                teamengine_password=teamengine_password,
+                treat_skipped_tests_as_failures=treat_skipped_tests_as_failures,
+            )
+        except exceptions.OgcCiteActionException as err:
+            logger.critical(err)
+            raise typer.Exit(1)
+        logger.warning(
+            f"Watching {watcher.fingerprinter.iut_url} every {interval}s - "
+            f"press Ctrl+C to stop"
+        )
+        try:
+            while max_runs is None or num_runs < max_runs:
+                try:
+                    run = watcher.poll()
+                except exceptions.OgcCiteActionException as err:
+                    # keep watching, the next poll retries the test suite
+                    logger.error(f"Test suite execution failed: {err}")
+                    run = None
+                if run is not None:
+                    num_runs += 1
+                    _store_results(ctx.obj.settings, run.result)
+                    print(_render_watch_run(run))
+                    if max_runs is not None and num_runs >= max_runs:
+                        break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.warning("Stopping...")
+
+
 def _execute_test_suite(
-        ctx: src.ogc_cite_action.config.CliContext,
+        ctx: config.CliContext,
         teamengine_base_url: str,
         test_suite_identifier: str,
         teamengine_username: pydantic.SecretStr,
@@ -199,17 +837,44 @@ def _execute_test_suite(
         test_suite_inputs: dict[str, list[str]],
         output_format: models.OutputFormat,
         treat_skipped_tests_as_failures: bool,
+        raw_output_path: Path | None = None,
+        run_preflight_checks: bool = False,
 ) -> tuple[models.TestSuiteResult, str]:
     logger.debug(f"{locals()=}")
-    client = httpx.Client(timeout=ctx.network_timeout_seconds)
-    base_url = teamengine_base_url.strip("/")
-    if teamengine_runner.wait_for_teamengine_to_be_ready(client, base_url):
-        logger.debug(
-            f"Asking teamengine to execute test suite {test_suite_identifier!r}...")
+    if raw_output_path is not None:
+        # check before running the suite, whose results would otherwise be lost
+        try:
+            compression.check_supported(
+                compression.get_compression_from_path(raw_output_path))
+        except exceptions.OgcCiteActionException as err:
+            logger.critical(err)
+            raise typer.Exit(1)
+    with teamengine_runner.get_http_client(
+            ctx.settings.network, ctx.network_timeout_seconds) as client:
+        if run_preflight_checks:
+            with instrumentation.phase("preflight"):
+                report = _run_preflight(
+                    client, ctx.settings, [test_suite_identifier], test_suite_inputs)
+            decision = report.get_decision(test_suite_identifier)
+            if not decision.run:
+                logger.warning(
+                    f"Not running test suite {test_suite_identifier!r}: "
+                    f"{decision.reason}"
+                )
+                # the report is the command's output, in place of the results
+                print(_render_preflight_report(report))
+                raise typer.Exit(0)
+            if decision.pruned_inputs:
+                logger.warning(
+                    f"Not passing inputs {decision.pruned_inputs} to test suite "
+                    f"{test_suite_identifier!r}, as the IUT does not declare "
+                    f"the conformance classes they are meant for"
+                )
+            test_suite_inputs = decision.test_suite_inputs
         try:
-            raw_result = teamengine_runner.execute_test_suite(
+            raw_result = teamengine_runner.run_test_suite(
                 client,
-                base_url,
+                teamengine_base_url,
                 test_suite_identifier,
                 test_suite_arguments=test_suite_inputs,
                 teamengine_username=teamengine_username,
@@ -218,23 +883,171 @@ def _execute_test_suite(
         except exceptions.OgcCiteActionException:
             logger.exception(f"Unable to collect test suite execution results")
             raise SystemExit(1)
-        else:
-            parsed = teamengine_runner.parse_test_suite_result(
-                raw_result, ctx.settings, treat_skipped_tests_as_failures)
-            if output_format == models.OutputFormat.RAW:
-                logger.debug(
-                    f"Outputting raw response, as returned by teamengine...")
-                serialized = raw_result
-            else:
-                logger.debug(f"Parsing test suite execution results...")
-                format_to_output = models.ParseableOutputFormat(output_format.value)
-                serialized = teamengine_runner.serialize_suite_result(
-                    parsed, format_to_output, ctx.settings, ctx.jinja_environment
-                )
-            return parsed, serialized
+    if raw_output_path is not None:
+        with instrumentation.phase("write-raw-result"):
+            with compression.open_raw_result(raw_output_path, "wb") as fh:
+                fh.write(raw_result)
+    _archive_raw_result(ctx.settings, raw_result, test_suite_identifier)
+    parsed = teamengine_runner.parse_test_suite_result(
+        raw_result,
+        ctx.settings,
+        treat_skipped_tests_as_failures,
+        test_suite_identifier=test_suite_identifier,
+    )
+    _store_results(ctx.settings, parsed)
+    if output_format == models.OutputFormat.RAW:
+        logger.debug(
+            f"Outputting raw response, as returned by teamengine...")
+        serialized = raw_result.decode("utf-8")
     else:
-        logger.critical(f"teamengine service is not available")
-        raise SystemExit(1)
+        logger.debug(f"Parsing test suite execution results...")
+        format_to_output = models.ParseableOutputFormat(output_format.value)
+        serialized = teamengine_runner.serialize_suite_result(
+            parsed, format_to_output, ctx.settings, ctx.jinja_environment
+        )
+    return parsed, serialized
+
+
+def _run_preflight(
+        client: httpx.Client,
+        settings: config.TeamEngineRunnerSettings,
+        test_suite_identifiers: list[str],
+        test_suite_inputs: dict[str, list[str]],
+) -> preflight.PreflightReport:
+    try:
+        return preflight.run_preflight(
+            client, settings, test_suite_identifiers, test_suite_inputs)
+    except exceptions.OgcCiteActionException as err:
+        logger.critical(err)
+        raise typer.Exit(1)
+
+
+def _render_preflight_report(report: preflight.PreflightReport) -> Table:
+    table = Table(
+        "test suite", "run", "reason", "pruned inputs",
+        title=(
+            f"Pre-flight checks for {report.capabilities.iut_url} "
+            f"({len(report.capabilities.conformance_classes)} declared "
+            f"conformance classes)"
+        )
+    )
+    for decision in report.decisions:
+        table.add_row(
+            decision.test_suite_identifier,
+            "yes" if decision.run else "no",
+            decision.reason,
+            ", ".join(
+                f"{name}={value}"
+                for name, values in decision.pruned_inputs.items()
+                for value in values
+            ),
+        )
+    return table
+
+
+def _render_watch_run(run: watch.WatchRun) -> Table | str:
+    summary = (
+        f"{run.result.suite_title} - "
+        f"{'passed' if run.result.passed else 'failed'} "
+        f"({run.result.num_tests_total} tests, "
+        f"{run.result.num_failed_tests} failed, "
+        f"{run.result.num_skipped_tests} skipped)"
+    )
+    if run.is_first_run:
+        return summary
+    if len(run.changes) == 0:
+        return f"{summary} - no status changes"
+    table = Table(
+        "conformance class", "test case", "previous status", "status", "detail",
+        title=summary,
+    )
+    for change in run.changes:
+        table.add_row(
+            escape(change.conformance_class),
+            escape(change.identifier),
+            change.previous_status.value if change.previous_status else "(new)",
+            change.status.value if change.status else "(removed)",
+            escape(change.detail or ""),
+        )
+    return table
+
+
+def _get_results_store(
+        settings: config.TeamEngineRunnerSettings,
+        results_store_path: Path | None,
+) -> results_store.ResultsStore:
+    if (path := results_store_path or settings.results_store_path) is None:
+        logger.critical(
+            "No results store configured - use the --results-store-path option "
+            "or the results_store_path setting"
+        )
+        raise typer.Exit(1)
+    return results_store.ResultsStore(path)
+
+
+def _store_results(
+        settings: config.TeamEngineRunnerSettings,
+        parsed: models.TestSuiteResult
+) -> None:
+    if settings.results_store_path is not None:
+        with instrumentation.phase("store-results"):
+            with results_store.ResultsStore(settings.results_store_path) as store:
+                store.ingest(parsed)
+
+
+def _get_archive(
+        settings: config.TeamEngineRunnerSettings,
+        archive_path: Path | None,
+) -> archive.Archive:
+    if (path := archive_path or settings.archive_path) is None:
+        logger.critical(
+            "No archive configured - use the --archive-path option or the "
+            "archive_path setting"
+        )
+        raise typer.Exit(1)
+    return archive.Archive(path)
+
+
+def _archive_raw_result(
+        settings: config.TeamEngineRunnerSettings,
+        raw_result: bytes,
+        test_suite_identifier: str,
+) -> None:
+    if settings.archive_path is not None:
+        with instrumentation.phase("archive-raw-result"):
+            with archive.Archive(settings.archive_path) as archive_:
+                archive_.add(raw_result, test_suite_identifier)
+
+
+def _render_occurrences(
+        occurrences: list[results_store.TestCaseOccurrence]
+) -> Table:
+    table = Table("started", "suite", "IUT", "status", "detail")
+    for occurrence in occurrences:
+        table.add_row(
+            occurrence.test_run_start.isoformat(),
+            occurrence.suite_title,
+            escape(occurrence.iut or ""),
+            occurrence.status.value,
+            # details are free text, which often contains brackets
+            escape(occurrence.detail or ""),
+        )
+    return table
+
+
+def _write_metrics(
+        recorder: instrumentation.MetricsRecorder,
+        metrics_target: str | None,
+        profile_target: Path | None,
+) -> None:
+    if metrics_target is not None:
+        serialized = recorder.get_metrics().model_dump_json(indent=2)
+        if metrics_target == "-":
+            stdlib_print(serialized, file=sys.stderr)
+        else:
+            Path(metrics_target).write_text(serialized)
+    if profile_target is not None:
+        recorder.dump_profile(profile_target)
 
 
 def _get_exit_code(
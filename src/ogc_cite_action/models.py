@@ -1,8 +1,12 @@
 import datetime as dt
 import enum
+import hashlib
+import operator
+import re
 from typing import (
     Annotated,
     Generator,
+    Iterable,
 )
 
 import pydantic
@@ -38,6 +42,18 @@ class TestCaseResult(pydantic.BaseModel):
     description: str | None
 
 
+class FailureGroup(pydantic.BaseModel):
+    """Test cases which failed (or were skipped) for the same reason.
+
+    Test cases are referenced by their index in the conformance class' tests,
+    as the same test case may be run more than once.
+    """
+    signature: str
+    status: TestStatus
+    detail: str | None
+    test_case_indexes: list[int]
+
+
 class ConformanceClassResult(pydantic.BaseModel):
     title: str
     description: str
@@ -45,6 +61,40 @@ class ConformanceClassResult(pydantic.BaseModel):
     num_passed_tests: int
     num_skipped_tests: int
     tests: list[TestCaseResult]
+    _failure_groups: tuple[tuple, list[FailureGroup]] | None = (
+        pydantic.PrivateAttr(default=None))
+
+    @property
+    def failure_groups(self) -> list[FailureGroup]:
+        """Failed and skipped test cases, grouped by their failure signature.
+
+        Groups are derived from `tests`, and are only reused for as long as
+        the status and detail of every test case are unchanged.
+        """
+        key = tuple(map(_get_status_and_detail, self.tests))
+        if self._failure_groups is None or self._failure_groups[0] != key:
+            self._failure_groups = (key, group_failures(self.tests))
+        return self._failure_groups[1]
+
+    def gen_failed_test_groups(
+            self
+    ) -> Generator[tuple[FailureGroup, list[TestCaseResult]], None, None]:
+        yield from self._gen_test_groups(TestStatus.FAILED)
+
+    def gen_skipped_test_groups(
+            self
+    ) -> Generator[tuple[FailureGroup, list[TestCaseResult]], None, None]:
+        yield from self._gen_test_groups(TestStatus.SKIPPED)
+
+    def _gen_test_groups(
+            self,
+            status: TestStatus
+    ) -> Generator[tuple[FailureGroup, list[TestCaseResult]], None, None]:
+        for failure_group in self.failure_groups:
+            if failure_group.status == status:
+                yield failure_group, [
+                    self.tests[index] for index in failure_group.test_case_indexes
+                ]
 
     def gen_failed_tests(self) -> Generator[TestCaseResult, None, None]:
         for test_case in self.tests:
@@ -62,6 +112,44 @@ class ConformanceClassResult(pydantic.BaseModel):
                 yield test_case
 
 
+def get_failure_signature(status: TestStatus, detail: str | None) -> str:
+    """Get a hash of the status and normalised detail of a test case.
+
+    Whitespace is collapsed and java object hash codes (as in
+    `TestPoint@1b2c3d4`) are removed, as they differ between otherwise
+    identical failures.
+    """
+    normalised = _JAVA_HASH_CODE_PATTERN.sub(
+        "@", " ".join((detail or "").split()))
+    return hashlib.sha256(
+        f"{status.value}:{normalised}".encode()).hexdigest()[:16]
+
+
+def group_failures(test_cases: Iterable[TestCaseResult]) -> list[FailureGroup]:
+    """Group failed and skipped test cases by their failure signature.
+
+    Groups are ordered by the first occurrence of their signature.
+    """
+    groups: dict[str, FailureGroup] = {}
+    for index, test_case in enumerate(test_cases):
+        if test_case.status == TestStatus.PASSED:
+            continue
+        signature = get_failure_signature(test_case.status, test_case.detail)
+        if (group := groups.get(signature)) is None:
+            group = groups[signature] = FailureGroup(
+                signature=signature,
+                status=test_case.status,
+                detail=test_case.detail,
+                test_case_indexes=[],
+            )
+        group.test_case_indexes.append(index)
+    return list(groups.values())
+
+
+_JAVA_HASH_CODE_PATTERN = re.compile(r"@[0-9a-f]{5,8}\b")
+_get_status_and_detail = operator.attrgetter("status", "detail")
+
+
 class TestSuiteResult(pydantic.BaseModel):
     suite_identifier: str
     suite_title: str
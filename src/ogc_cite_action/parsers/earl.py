@@ -8,12 +8,38 @@ https://www.w3.org/TR/EARL10-Schema
 """
 
 import datetime as dt
+import functools
+import logging
+from typing import (
+    Iterable,
+    NamedTuple,
+)
 
 from isodate import parse_duration
 from lxml import etree
 
 from .. import models
-from ..teamengine_runner import logger
+
+logger = logging.getLogger(__name__)
+
+_TEST_STATUSES = {
+    "passed": models.TestStatus.PASSED,
+    "failed": models.TestStatus.FAILED,
+    "untested": models.TestStatus.SKIPPED,
+}
+
+
+class _AssertionXPaths(NamedTuple):
+    """Compiled expressions for extracting a test case from an assertion.
+
+    These are evaluated for every assertion, which is considerably faster
+    with precompiled expressions than with `find()` and a path string.
+    """
+    outcome: etree.XPath
+    identifier: etree.XPath
+    title: etree.XPath
+    description: etree.XPath
+    detail: etree.XPath
 
 
 def parse_test_suite_result(
@@ -21,6 +47,39 @@ def parse_test_suite_result(
         treat_skipped_as_failure: bool,
 ) -> models.TestSuiteResult:
     """Parse test suite result from EARL."""
+    nsmap = suite_result.nsmap
+    return build_test_suite_result(
+        suite_result,
+        (
+            _parse_assertion(assertion_el, nsmap)
+            for assertion_el in suite_result.findall(
+                "earl:Assertion", namespaces=nsmap)
+        ),
+        treat_skipped_as_failure
+    )
+
+
+def get_test_suite_identifier(suite_result: etree.Element) -> str | None:
+    """Get the identifier of the test suite, including its version.
+
+    TEAM Engine reports it as the title of the test run, _e.g._
+    `ogcapi-features-1.0-1.6`.
+    """
+    title_el = suite_result.find(
+        "./cite:TestRun/dct:title", namespaces=suite_result.nsmap)
+    return title_el.text if title_el is not None else None
+
+
+def build_test_suite_result(
+        suite_result: etree.Element,
+        test_case_results: Iterable[models.TestCaseResult],
+        treat_skipped_as_failure: bool,
+) -> models.TestSuiteResult:
+    """Build the test suite result from its test run and parsed test cases.
+
+    Only the `cite:TestRun` element of `suite_result` is inspected, which
+    allows test cases to be parsed separately from the rest of the document.
+    """
     test_run_el = suite_result.find("./cite:TestRun", namespaces=suite_result.nsmap)
     suite_title = test_run_el.find("dct:title", namespaces=suite_result.nsmap).text
     suite_identifier = test_run_el.find("dct:identifier", namespaces=suite_result.nsmap).text
@@ -38,13 +97,17 @@ def parse_test_suite_result(
     )
     suite_inputs = _parse_test_inputs(test_run_el, suite_result.nsmap)
     conf_classes = _parse_test_requirements(test_run_el, suite_result.nsmap)
-    for assertion_el in suite_result.findall(
-            "earl:Assertion", namespaces=suite_result.nsmap):
-        test_case_result = _parse_assertion(assertion_el, suite_result.nsmap)
-        for conf_class_result, conf_class_parts in conf_classes:
-            if test_case_result.identifier in conf_class_parts:
-                conf_class_result.tests.append(test_case_result)
-                break
+    # a test case belongs to the first conformance class that lists it
+    conf_class_by_part = {}
+    for conf_class_result, conf_class_parts in conf_classes:
+        for part_id in conf_class_parts:
+            conf_class_by_part.setdefault(part_id, conf_class_result)
+    for test_case_result in test_case_results:
+        if (
+                conf_class_result := conf_class_by_part.get(
+                    test_case_result.identifier)
+        ) is not None:
+            conf_class_result.tests.append(test_case_result)
         else:
             print(
                 f"test case {test_case_result.identifier} is not part of any "
@@ -152,56 +215,48 @@ def _parse_assertion(
         assertion_el: etree.Element,
         nsmap: dict
 ) -> models.TestCaseResult:
-    raw_outcome = assertion_el.find(
-        "earl:result/earl:TestResult/earl:outcome",
-        namespaces=nsmap
-    ).attrib[f"{{{nsmap['rdf']}}}resource"]
-    outcome = raw_outcome.split("earl#")[-1]
-    test_status = {
-        "passed": models.TestStatus.PASSED,
-        "failed": models.TestStatus.FAILED,
-        "untested": models.TestStatus.SKIPPED,
-    }[outcome]
-
-    try:
-        test_identifier = assertion_el.find(
-            "earl:test",
-            namespaces=nsmap
-        ).attrib[f"{{{nsmap['rdf']}}}resource"]
-    except KeyError:
-        test_identifier = assertion_el.find(
-            "earl:test/earl:TestCase",
-            namespaces=nsmap
-        ).attrib[f"{{{nsmap['rdf']}}}about"]
-    title = (
-        title_el.text
-        if (
-               title_el := assertion_el.find(
-                   "earl:test/earl:TestCase/dct:title", namespaces=nsmap)
-           ) is not None else None
-    )
-    description = (
-        description_el.text
-        if (
-               description_el := assertion_el.find(
-                   "earl:test/earl:TestCase/dct:description", namespaces=nsmap)
-           ) is not None else None
-    )
+    xpaths = _get_assertion_xpaths(tuple(nsmap.items()))
+    raw_outcome = xpaths.outcome(assertion_el)[0]
+    test_status = _TEST_STATUSES[raw_outcome.split("earl#")[-1]]
+    # the test case is either referenced or described inline
+    test_identifier = xpaths.identifier(assertion_el)[0]
     test_detail = None
     if test_status in (models.TestStatus.FAILED, models.TestStatus.SKIPPED):
-        test_detail = assertion_el.find(
-            "earl:result/earl:TestResult/dct:description",
-            namespaces=nsmap
-        ).text
+        test_detail = _get_first_text(xpaths.detail(assertion_el))
     return models.TestCaseResult(
         identifier=test_identifier,
         status=test_status,
         detail=test_detail,
-        name=title,
-        description=description,
+        name=_get_first_text(xpaths.title(assertion_el)),
+        description=_get_first_text(xpaths.description(assertion_el)),
     )
 
 
+@functools.lru_cache(maxsize=16)
+def _get_assertion_xpaths(
+        nsmap_items: tuple[tuple[str | None, str], ...]
+) -> _AssertionXPaths:
+    namespaces = {
+        prefix: uri for prefix, uri in nsmap_items if prefix is not None}
+
+    def compile_xpath(path: str) -> etree.XPath:
+        return etree.XPath(path, namespaces=namespaces, smart_strings=False)
+
+    return _AssertionXPaths(
+        outcome=compile_xpath(
+            "earl:result/earl:TestResult/earl:outcome/@rdf:resource"),
+        identifier=compile_xpath(
+            "earl:test/@rdf:resource | earl:test/earl:TestCase/@rdf:about"),
+        title=compile_xpath("earl:test/earl:TestCase/dct:title"),
+        description=compile_xpath("earl:test/earl:TestCase/dct:description"),
+        detail=compile_xpath("earl:result/earl:TestResult/dct:description"),
+    )
+
+
+def _get_first_text(elements: list[etree.Element]) -> str | None:
+    return elements[0].text if elements else None
+
+
 def _parse_to_datetime(temporal_value: str) -> dt.datetime:
     return dt.datetime.fromisoformat(
         temporal_value.strip("Z")).replace(tzinfo=dt.timezone.utc)
@@ -0,0 +1,185 @@
+"""Parallel parsing of a single large EARL document.
+
+Assertions are independent of each other, so the document is split into
+chunks without building its full tree first:
+
+1. a byte scan locates the boundaries of the `earl:Assertion` elements
+2. the rest of the document, which holds the test run with its conformance
+   classes, is parsed in the current process
+3. assertions are grouped into chunks, each of which is wrapped in a copy of
+   the root element's start tag (so that namespace prefixes still resolve)
+   and parsed by a pool of worker processes
+4. the parsed test cases are merged in document order, which means the
+   result is exactly the same as the one of the sequential parser
+
+Documents whose structure the byte scan cannot safely handle (comments,
+CDATA sections, a DTD or an unusual layout) are parsed sequentially instead.
+"""
+
+import concurrent.futures
+import itertools
+import logging
+import re
+
+from lxml import etree
+
+from .. import (
+    exceptions,
+    models,
+)
+from . import earl
+
+logger = logging.getLogger(__name__)
+
+_EARL_NAMESPACE = b"http://www.w3.org/ns/earl#"
+_XML_DECLARATION_PATTERN = re.compile(rb"\s*<\?xml[^>]*\?>")
+_ATTRIBUTES_PATTERN = rb"""(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*"""
+_START_TAG_PATTERN = re.compile(rb"<([^\s/>]+)" + _ATTRIBUTES_PATTERN + rb">")
+_UNSAFE_MARKERS = (b"<!--", b"<![CDATA[", b"<!DOCTYPE")
+_PLACEHOLDER_TARGET = "ogc-cite-action-assertion"
+
+
+class EarlDocumentSplit:
+    """EARL document whose assertions have been located by a byte scan."""
+
+    def __init__(self, raw_result: bytes):
+        self.raw_result = raw_result
+        declaration_match = _XML_DECLARATION_PATTERN.match(raw_result)
+        self.xml_declaration = (
+            declaration_match.group().strip() if declaration_match else b"")
+        root_start = raw_result.index(
+            b"<", declaration_match.end() if declaration_match else 0)
+        if (
+                root_match := _START_TAG_PATTERN.match(raw_result, root_start)
+        ) is None:
+            raise ValueError("Could not find the start tag of the root element")
+        self.root_start_tag = root_match.group()
+        self.root_end_tag = b"</" + root_match.group(1) + b">"
+        self.assertion_spans = _find_assertion_spans(
+            raw_result,
+            root_match.end(),
+            _get_earl_prefix(self.root_start_tag)
+        )
+
+    def get_skeleton(self) -> bytes:
+        """Get the document with assertions replaced by placeholders."""
+        parts = []
+        previous_end = 0
+        for index, (start, end) in enumerate(self.assertion_spans):
+            parts.append(self.raw_result[previous_end:start])
+            parts.append(f"<?{_PLACEHOLDER_TARGET} {index}?>".encode())
+            previous_end = end
+        parts.append(self.raw_result[previous_end:])
+        return b"".join(parts)
+
+    def get_chunk(self, assertion_indexes: list[int]) -> bytes:
+        return b"".join((
+            self.xml_declaration,
+            self.root_start_tag,
+            *(
+                self.raw_result[slice(*self.assertion_spans[index])]
+                for index in assertion_indexes
+            ),
+            self.root_end_tag,
+        ))
+
+
+def parse_test_suite_result(
+        raw_result: bytes,
+        treat_skipped_as_failure: bool,
+        num_workers: int,
+        min_chunk_size: int = 1_000,
+) -> models.TestSuiteResult:
+    """Parse an EARL document, spreading its assertions over worker processes.
+
+    The document is split into at most four chunks per worker, each holding
+    at least `min_chunk_size` assertions. Small documents are therefore
+    parsed sequentially, as that is faster than starting a process pool.
+    """
+    parser = etree.XMLParser(resolve_entities=False)
+    try:
+        if any(marker in raw_result for marker in _UNSAFE_MARKERS):
+            raise ValueError("Document contains comments, CDATA or a DTD")
+        split = EarlDocumentSplit(raw_result)
+    except ValueError as exc:
+        logger.info(f"Cannot split document ({exc}) - parsing it sequentially")
+        split = None
+    try:
+        if split is None:
+            return earl.parse_test_suite_result(
+                etree.fromstring(raw_result, parser), treat_skipped_as_failure)
+        skeleton = etree.fromstring(split.get_skeleton(), parser)
+    except etree.ParseError as exc:
+        raise exceptions.OgcCiteActionException(
+            "Unable to parse test suite execution result as XML") from exc
+    # like the sequential parser, only consider assertions that are direct
+    # children of the root element
+    assertion_indexes = [
+        int(child.text) for child in skeleton
+        if child.tag is etree.PI and child.target == _PLACEHOLDER_TARGET
+    ]
+    chunk_size = max(
+        min_chunk_size, -(-len(assertion_indexes) // (num_workers * 4)))
+    num_chunks = -(-len(assertion_indexes) // chunk_size)
+    chunks = (
+        split.get_chunk(assertion_indexes[start:start + chunk_size])
+        for start in range(0, len(assertion_indexes), chunk_size)
+    )
+    logger.debug(
+        f"Split {len(assertion_indexes)} assertions into {num_chunks} chunks")
+    if num_chunks <= 1 or num_workers <= 1:
+        return earl.build_test_suite_result(
+            skeleton,
+            itertools.chain.from_iterable(map(_parse_chunk, chunks)),
+            treat_skipped_as_failure
+        )
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(num_workers, num_chunks)) as executor:
+        # executor.map yields chunks in order, keeping test cases in document order
+        return earl.build_test_suite_result(
+            skeleton,
+            itertools.chain.from_iterable(executor.map(_parse_chunk, chunks)),
+            treat_skipped_as_failure
+        )
+
+
+def _parse_chunk(chunk: bytes) -> list[models.TestCaseResult]:
+    root = etree.fromstring(chunk, etree.XMLParser(resolve_entities=False))
+    return [
+        earl._parse_assertion(assertion_el, root.nsmap)
+        for assertion_el in root.findall("earl:Assertion", namespaces=root.nsmap)
+    ]
+
+
+def _get_earl_prefix(root_start_tag: bytes) -> bytes:
+    if (
+            match := re.search(
+                rb"""xmlns:([^\s=]+)\s*=\s*["']"""
+                + re.escape(_EARL_NAMESPACE) + rb"""["']""",
+                root_start_tag
+            )
+    ) is None:
+        raise ValueError("Root element does not declare the EARL namespace")
+    return match.group(1)
+
+
+def _find_assertion_spans(
+        raw_result: bytes,
+        offset: int,
+        earl_prefix: bytes,
+) -> list[tuple[int, int]]:
+    start_tag_pattern = re.compile(
+        rb"<" + re.escape(earl_prefix) + rb":Assertion"
+        + _ATTRIBUTES_PATTERN + rb"(/?)>"
+    )
+    end_tag = b"</" + earl_prefix + b":Assertion>"
+    spans = []
+    while (match := start_tag_pattern.search(raw_result, offset)) is not None:
+        if match.group(1) == b"/":
+            offset = match.end()
+        elif (end := raw_result.find(end_tag, match.end())) != -1:
+            offset = end + len(end_tag)
+        else:
+            raise ValueError("Unterminated earl:Assertion element")
+        spans.append((match.start(), offset))
+    return spans
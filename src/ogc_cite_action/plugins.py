@@ -0,0 +1,301 @@
+"""Registry of the parsers and serializers used for test suite results.
+
+Parsers and serializers are discovered from two sources:
+
+- settings - the default parser and serializers, plus any suite-specific ones
+  defined in `suite_parsers` and `suite_serializers`
+- the `ogc_cite_action.parsers` and `ogc_cite_action.serializers` package
+  entry point groups, which allow third-party packages to provide
+  suite-specific plugins. Parser entry points are named after the test suite
+  identifier (_e.g._ `ogcapi-features-1.0`) and serializer entry points are
+  named `{test suite identifier}:{output format}`
+  (_e.g._ `ogcapi-features-1.0:markdown`)
+
+Settings take precedence over entry points. All plugins are loaded and
+validated when the registry is created, so that misconfiguration is reported
+before running any test suite. A registry can also be created leniently, in
+which case plugins that cannot be loaded are recorded as errors instead, so
+that they can be reported.
+"""
+
+import importlib
+import logging
+import typing
+from importlib import metadata
+
+import pydantic
+
+from . import (
+    config,
+    exceptions,
+    models,
+)
+
+logger = logging.getLogger(__name__)
+
+PARSERS_ENTRY_POINT_GROUP = "ogc_cite_action.parsers"
+SERIALIZERS_ENTRY_POINT_GROUP = "ogc_cite_action.serializers"
+
+_registries: dict[str, "PluginRegistry"] = {}
+
+
+class PluginInfo(pydantic.BaseModel):
+    kind: typing.Literal["parser", "serializer"]
+    test_suite_identifier: str | None
+    output_format: models.ParseableOutputFormat | None = None
+    python_path: str
+    source: typing.Literal["settings", "entry-point"]
+    error: str | None = None
+
+
+class PluginRegistry:
+
+    def __init__(
+            self,
+            settings: config.TeamEngineRunnerSettings,
+            strict: bool = True,
+    ):
+        self.strict = strict
+        self.plugins: list[PluginInfo] = []
+        # plugins that could not be loaded, when not strict
+        self.errors: list[PluginInfo] = []
+        self._parsers: dict[str | None, typing.Callable] = {}
+        self._serializers: dict[
+            tuple[models.ParseableOutputFormat, str | None], typing.Callable
+        ] = {}
+        self._lookup_cache: dict[tuple, typing.Callable] = {}
+        self._discover_entry_points()
+        self._discover_settings(settings)
+
+    @property
+    def has_suite_parsers(self) -> bool:
+        return any(suite is not None for suite in self._parsers)
+
+    def get_parser(
+            self,
+            test_suite_identifier: str | None = None
+    ) -> typing.Callable:
+        cache_key = ("parser", test_suite_identifier)
+        if (parser := self._lookup_cache.get(cache_key)) is None:
+            parser = self._parsers[
+                self._find_suite_key(test_suite_identifier, self._parsers)]
+            self._lookup_cache[cache_key] = parser
+        return parser
+
+    def get_serializer(
+            self,
+            output_format: models.ParseableOutputFormat,
+            test_suite_identifier: str | None = None,
+    ) -> typing.Callable:
+        cache_key = ("serializer", output_format, test_suite_identifier)
+        if (serializer := self._lookup_cache.get(cache_key)) is None:
+            format_serializers = {
+                suite: serializer_
+                for (format_, suite), serializer_ in self._serializers.items()
+                if format_ == output_format
+            }
+            serializer = format_serializers[
+                self._find_suite_key(test_suite_identifier, format_serializers)]
+            self._lookup_cache[cache_key] = serializer
+        return serializer
+
+    def _discover_entry_points(self) -> None:
+        for entry_point in metadata.entry_points(group=PARSERS_ENTRY_POINT_GROUP):
+            self._register(
+                PluginInfo(
+                    kind="parser",
+                    test_suite_identifier=entry_point.name,
+                    python_path=entry_point.value.replace(":", "."),
+                    source="entry-point",
+                ),
+                loader=entry_point.load,
+            )
+        for entry_point in metadata.entry_points(
+                group=SERIALIZERS_ENTRY_POINT_GROUP):
+            suite_identifier, _, raw_format = entry_point.name.rpartition(":")
+            try:
+                output_format = models.ParseableOutputFormat(raw_format)
+            except ValueError as exc:
+                self._handle_error(
+                    PluginInfo(
+                        kind="serializer",
+                        test_suite_identifier=suite_identifier or None,
+                        python_path=entry_point.value.replace(":", "."),
+                        source="entry-point",
+                    ),
+                    f"Invalid output format in serializer entry point "
+                    f"{entry_point.name!r}",
+                    exc
+                )
+                continue
+            self._register(
+                PluginInfo(
+                    kind="serializer",
+                    test_suite_identifier=suite_identifier or None,
+                    output_format=output_format,
+                    python_path=entry_point.value.replace(":", "."),
+                    source="entry-point",
+                ),
+                loader=entry_point.load,
+            )
+
+    def _discover_settings(self, settings: config.TeamEngineRunnerSettings) -> None:
+        configured = [
+            PluginInfo(
+                kind="parser",
+                test_suite_identifier=None,
+                python_path=settings.default_parser,
+                source="settings",
+            ),
+            PluginInfo(
+                kind="serializer",
+                test_suite_identifier=None,
+                output_format=models.ParseableOutputFormat.JSON,
+                python_path=settings.default_json_serializer,
+                source="settings",
+            ),
+            PluginInfo(
+                kind="serializer",
+                test_suite_identifier=None,
+                output_format=models.ParseableOutputFormat.MARKDOWN,
+                python_path=settings.default_markdown_serializer,
+                source="settings",
+            ),
+        ]
+        for suite_identifier, python_path in settings.suite_parsers.items():
+            configured.append(
+                PluginInfo(
+                    kind="parser",
+                    test_suite_identifier=suite_identifier,
+                    python_path=python_path,
+                    source="settings",
+                )
+            )
+        for suite_identifier, serializers in settings.suite_serializers.items():
+            for output_format, python_path in serializers.items():
+                configured.append(
+                    PluginInfo(
+                        kind="serializer",
+                        test_suite_identifier=suite_identifier,
+                        output_format=output_format,
+                        python_path=python_path,
+                        source="settings",
+                    )
+                )
+        for plugin_info in configured:
+            self._register(
+                plugin_info,
+                loader=lambda path=plugin_info.python_path: _load_python_object(path)
+            )
+
+    def _register(
+            self,
+            plugin_info: PluginInfo,
+            loader: typing.Callable[[], typing.Any]
+    ) -> None:
+        try:
+            plugin = loader()
+        except (ImportError, AttributeError, ValueError) as exc:
+            self._handle_error(
+                plugin_info,
+                f"Could not load {plugin_info.kind} {plugin_info.python_path!r} "
+                f"({plugin_info.source})",
+                exc
+            )
+            return
+        if not callable(plugin):
+            self._handle_error(
+                plugin_info,
+                f"{plugin_info.kind.capitalize()} {plugin_info.python_path!r} "
+                f"({plugin_info.source}) is not callable"
+            )
+            return
+        if plugin_info.kind == "parser":
+            self._parsers[plugin_info.test_suite_identifier] = plugin
+        else:
+            self._serializers[
+                (plugin_info.output_format, plugin_info.test_suite_identifier)
+            ] = plugin
+        self.plugins = [
+            info for info in self.plugins
+            if (
+                info.kind,
+                info.test_suite_identifier,
+                info.output_format
+            ) != (
+                plugin_info.kind,
+                plugin_info.test_suite_identifier,
+                plugin_info.output_format
+            )
+        ]
+        self.plugins.append(plugin_info)
+        logger.debug(f"Registered {plugin_info!r}")
+
+    def _handle_error(
+            self,
+            plugin_info: PluginInfo,
+            message: str,
+            exc: Exception | None = None,
+    ) -> None:
+        if self.strict:
+            raise exceptions.OgcCiteActionException(message) from exc
+        detail = f"{message}: {exc}" if exc is not None else message
+        logger.debug(detail)
+        self.errors.append(plugin_info.model_copy(update={"error": detail}))
+
+    @staticmethod
+    def _find_suite_key(
+            test_suite_identifier: str | None,
+            candidates: typing.Collection[str | None],
+    ) -> str | None:
+        """Find the best plugin key for the input test suite identifier.
+
+        Suite results usually carry an identifier that also includes the
+        version of the executable test suite (_e.g._
+        `ogcapi-features-1.0-1.6`), so plugins that are registered for a
+        prefix of the input identifier are also considered a match. If there
+        is no match, the default plugin is used.
+        """
+        if test_suite_identifier is None:
+            return None
+        if test_suite_identifier in candidates:
+            return test_suite_identifier
+        matches = [
+            key for key in candidates
+            if key is not None and test_suite_identifier.startswith(key)
+        ]
+        if matches:
+            return max(matches, key=len)
+        logger.info(
+            f"Could not find a custom plugin for test suite "
+            f"{test_suite_identifier!r} - using the default"
+        )
+        return None
+
+
+def get_registry(settings: config.TeamEngineRunnerSettings) -> PluginRegistry:
+    """Get the plugin registry for the input settings.
+
+    Registries are cached, so plugins are discovered only once per distinct
+    configuration. The registry is also remembered by the settings instance
+    itself, so that looking it up again does not need to dump the settings.
+    """
+    # the owner's id is checked, as copies of the settings, which may have
+    # been updated, get a copy of the private attribute too
+    cached = settings._plugin_registry
+    if cached is not None and cached[0] == id(settings):
+        return cached[1]
+    cache_key = settings.model_dump_json()
+    if (registry := _registries.get(cache_key)) is None:
+        registry = PluginRegistry(settings)
+        _registries[cache_key] = registry
+    settings._plugin_registry = (id(settings), registry)
+    return registry
+
+
+def _load_python_object(
+        object_path: str
+) -> typing.Union[typing.Type, typing.Callable] | None:
+    module_path, object_name = object_path.rpartition(".")[::2]
+    module = importlib.import_module(module_path)
+    return getattr(module, object_name)
@@ -0,0 +1,263 @@
+"""Pre-flight checks which decide whether a test suite is worth running.
+
+Before executing a test suite, the implementation under test (IUT) is probed:
+its landing page and its `/conformance` document are fetched concurrently and
+the conformance classes it declares are compared with the rules from the
+`preflight_rules` setting. Suites whose conformance classes are not declared
+by the IUT would only produce skipped tests, so they are pruned, as are suite
+inputs that only matter for undeclared conformance classes.
+
+Whenever the IUT's capabilities cannot be determined, nothing is pruned.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+import typing
+import urllib.parse
+
+import httpx
+import pydantic
+
+from . import (
+    config,
+    exceptions,
+)
+
+logger = logging.getLogger(__name__)
+
+_CONFORMANCE_LINK_RELATIONS = (
+    "conformance",
+    "http://www.opengis.net/def/rel/ogc/1.0/conformance",
+)
+
+
+class IutCapabilities(pydantic.BaseModel):
+    iut_url: str
+    landing_page: dict | None = None
+    conformance_classes: list[str] = []
+    errors: list[str] = []
+
+    @property
+    def is_known(self) -> bool:
+        return len(self.conformance_classes) > 0
+
+
+class PreflightDecision(pydantic.BaseModel):
+    test_suite_identifier: str
+    run: bool
+    reason: str
+    test_suite_inputs: dict[str, list[str]]
+    pruned_inputs: dict[str, list[str]] = {}
+
+
+class PreflightReport(pydantic.BaseModel):
+    capabilities: IutCapabilities
+    decisions: list[PreflightDecision]
+
+    def get_decision(self, test_suite_identifier: str) -> PreflightDecision:
+        for decision in self.decisions:
+            if decision.test_suite_identifier == test_suite_identifier:
+                return decision
+        raise KeyError(test_suite_identifier)
+
+
+class _CapabilitiesCache:
+    """Thread-safe cache of probed IUTs, whose entries expire."""
+
+    def __init__(self):
+        self._items: dict[str, tuple[float, IutCapabilities]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, iut_url: str, max_age_seconds: float) -> IutCapabilities | None:
+        with self._lock:
+            if (item := self._items.get(iut_url)) is not None:
+                stored_at, capabilities = item
+                if time.monotonic() - stored_at <= max_age_seconds:
+                    return capabilities
+                del self._items[iut_url]
+            return None
+
+    def set(self, iut_url: str, capabilities: IutCapabilities) -> None:
+        with self._lock:
+            self._items[iut_url] = (time.monotonic(), capabilities)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _CapabilitiesCache()
+
+
+def run_preflight(
+        client: httpx.Client,
+        settings: config.TeamEngineRunnerSettings,
+        test_suite_identifiers: typing.Sequence[str],
+        test_suite_inputs: dict[str, list[str]],
+) -> PreflightReport:
+    """Decide which test suites, and which of their inputs, are worth running."""
+    if not (iut_urls := test_suite_inputs.get("iut")):
+        raise exceptions.OgcCiteActionException(
+            "Cannot run pre-flight checks without an 'iut' test suite input")
+    capabilities = get_iut_capabilities(
+        client, iut_urls[0], settings.preflight_cache_seconds)
+    return PreflightReport(
+        capabilities=capabilities,
+        decisions=[
+            decide(
+                test_suite_identifier,
+                test_suite_inputs,
+                capabilities,
+                get_rule(settings, test_suite_identifier)
+            ) for test_suite_identifier in test_suite_identifiers
+        ]
+    )
+
+
+def get_iut_capabilities(
+        client: httpx.Client,
+        iut_url: str,
+        max_age_seconds: float = 300,
+) -> IutCapabilities:
+    """Fetch the IUT's landing page and conformance document.
+
+    Both documents are requested concurrently and, if the IUT responds, the
+    outcome is cached for `max_age_seconds`, so checking several suites
+    against the same IUT only probes it once.
+    """
+    iut_url = iut_url.rstrip("/")
+    if (capabilities := _cache.get(iut_url, max_age_seconds)) is not None:
+        logger.debug(f"Reusing cached capabilities of {iut_url!r}")
+        return capabilities
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        landing_page_future = executor.submit(_fetch_json, client, f"{iut_url}/")
+        conformance_future = executor.submit(
+            _fetch_json, client, f"{iut_url}/conformance")
+        landing_page, landing_page_error = landing_page_future.result()
+        conformance, conformance_error = conformance_future.result()
+    if conformance is None and landing_page is not None:
+        # the conformance document does not always live at /conformance
+        if (
+                conformance_url := _get_conformance_url(
+                    landing_page, f"{iut_url}/")
+        ) is not None:
+            conformance, conformance_error = _fetch_json(client, conformance_url)
+    conformance_classes = []
+    for document in (conformance, landing_page):
+        for conformance_class in (document or {}).get("conformsTo", []):
+            if conformance_class not in conformance_classes:
+                conformance_classes.append(conformance_class)
+    capabilities = IutCapabilities(
+        iut_url=iut_url,
+        landing_page=landing_page,
+        conformance_classes=conformance_classes,
+        errors=[
+            error for error in (landing_page_error, conformance_error)
+            if error is not None
+        ],
+    )
+    if capabilities.is_known:
+        _cache.set(iut_url, capabilities)
+    return capabilities
+
+
+def get_rule(
+        settings: config.TeamEngineRunnerSettings,
+        test_suite_identifier: str,
+) -> config.PreflightRule | None:
+    """Get the rule for a test suite, matching its identifier by prefix."""
+    matches = [
+        key for key in settings.preflight_rules
+        if test_suite_identifier.startswith(key)
+    ]
+    return settings.preflight_rules[max(matches, key=len)] if matches else None
+
+
+def decide(
+        test_suite_identifier: str,
+        test_suite_inputs: dict[str, list[str]],
+        capabilities: IutCapabilities,
+        rule: config.PreflightRule | None,
+) -> PreflightDecision:
+    if rule is None:
+        return PreflightDecision(
+            test_suite_identifier=test_suite_identifier,
+            run=True,
+            reason="No pre-flight rule for this test suite",
+            test_suite_inputs=test_suite_inputs,
+        )
+    if not capabilities.is_known:
+        return PreflightDecision(
+            test_suite_identifier=test_suite_identifier,
+            run=True,
+            reason=(
+                f"Could not determine the conformance classes of the IUT: "
+                f"{'; '.join(capabilities.errors)}"
+            ),
+            test_suite_inputs=test_suite_inputs,
+        )
+    declared = set(capabilities.conformance_classes)
+    if rule.conformance_classes and declared.isdisjoint(rule.conformance_classes):
+        return PreflightDecision(
+            test_suite_identifier=test_suite_identifier,
+            run=False,
+            reason=(
+                f"IUT does not declare any of the conformance classes "
+                f"{', '.join(rule.conformance_classes)}"
+            ),
+            test_suite_inputs={},
+        )
+    kept_inputs = {}
+    pruned_inputs = {}
+    for name, values in test_suite_inputs.items():
+        input_classes = rule.input_conformance_classes.get(name)
+        if input_classes and declared.isdisjoint(input_classes):
+            pruned_inputs[name] = values
+        else:
+            kept_inputs[name] = values
+    return PreflightDecision(
+        test_suite_identifier=test_suite_identifier,
+        run=True,
+        reason="IUT declares the relevant conformance classes",
+        test_suite_inputs=kept_inputs,
+        pruned_inputs=pruned_inputs,
+    )
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def _fetch_json(
+        client: httpx.Client,
+        url: str
+) -> tuple[dict | None, str | None]:
+    try:
+        response = client.get(
+            url, params={"f": "json"}, headers={"Accept": "application/json"})
+        response.raise_for_status()
+        if not isinstance(document := response.json(), dict):
+            raise ValueError("response is not a JSON object")
+        return document, None
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.info(f"Could not fetch {url!r}: {exc}")
+        return None, f"{url}: {exc}"
+
+
+def _get_conformance_url(landing_page: dict, landing_page_url: str) -> str | None:
+    """Get the conformance document's URL from the landing page's links.
+
+    Relative links are resolved against the landing page's URL.
+    """
+    if not isinstance(links := landing_page.get("links"), list):
+        return None
+    for link in links:
+        if (
+                isinstance(link, dict)
+                and link.get("rel") in _CONFORMANCE_LINK_RELATIONS
+                and isinstance(href := link.get("href"), str)
+        ):
+            return urllib.parse.urljoin(landing_page_url, href)
+    return None
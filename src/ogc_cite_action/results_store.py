@@ -0,0 +1,357 @@
+"""SQLite-backed store of historical test suite results.
+
+Each parsed `TestSuiteResult` is stored as a row in the `runs` table, with
+one row per test case in the `test_cases` table. Both are indexed so that
+questions like "what is the history of test X" or "which tests are flaky"
+can be answered without re-parsing any raw results.
+
+The same test case is usually run several times per suite run, e.g. once per
+collection of the IUT. Every occurrence is stored, and queries go through
+the `run_test_cases` view, which reduces them to a single status per run: a
+test case has failed in a run if any of its occurrences failed, and has only
+been skipped if all of them were skipped.
+"""
+
+import collections
+import datetime as dt
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Generator
+
+import pydantic
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    suite_title TEXT NOT NULL,
+    suite_identifier TEXT NOT NULL,
+    iut TEXT,
+    test_run_start TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    num_failed_tests INTEGER NOT NULL,
+    num_skipped_tests INTEGER NOT NULL,
+    num_passed_tests INTEGER NOT NULL
+);
+-- NULLs are distinct in unique indexes, so results without an IUT would
+-- never be recognised as already stored
+CREATE UNIQUE INDEX IF NOT EXISTS runs_unique_idx
+    ON runs (suite_title, coalesce(iut, ''), test_run_start);
+CREATE INDEX IF NOT EXISTS runs_suite_iut_start_idx
+    ON runs (suite_title, iut, test_run_start);
+CREATE INDEX IF NOT EXISTS runs_start_idx ON runs (test_run_start);
+CREATE INDEX IF NOT EXISTS runs_passed_idx ON runs (passed);
+
+CREATE TABLE IF NOT EXISTS test_cases (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    conformance_class TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    detail TEXT,
+    PRIMARY KEY (run_id, conformance_class, identifier, occurrence)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS test_cases_identifier_idx
+    ON test_cases (identifier, run_id);
+CREATE INDEX IF NOT EXISTS test_cases_status_idx
+    ON test_cases (status, identifier);
+
+-- one row per test case and run. min() picks the most severe status, and
+-- the detail is taken from the same row as it
+CREATE VIEW IF NOT EXISTS run_test_cases AS
+SELECT run_id, identifier, status, detail FROM (
+    SELECT run_id, identifier, status, detail, min(
+        CASE status WHEN 'FAILED' THEN 0 WHEN 'PASSED' THEN 1 ELSE 2 END
+    ) AS severity
+    FROM test_cases GROUP BY run_id, identifier
+);
+"""
+
+
+class StoredRun(pydantic.BaseModel):
+    id: int
+    suite_title: str
+    suite_identifier: str
+    iut: str | None
+    test_run_start: dt.datetime
+    passed: bool
+    num_failed_tests: int
+    num_skipped_tests: int
+    num_passed_tests: int
+
+
+class TestCaseOccurrence(pydantic.BaseModel):
+    identifier: str
+    status: models.TestStatus
+    detail: str | None
+    run_id: int
+    suite_title: str
+    iut: str | None
+    test_run_start: dt.datetime
+
+
+class FlakyTestCase(pydantic.BaseModel):
+    identifier: str
+    suite_title: str
+    iut: str | None
+    num_runs: int
+    num_status_changes: int
+    num_failures: int
+
+
+class ResultsStore:
+
+    def __init__(self, path: Path | str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def ingest(self, *results: models.TestSuiteResult) -> list[int]:
+        """Store test suite results, returning the ids of the new runs.
+
+        All results are stored in a single transaction. Results that have
+        already been stored (same suite, IUT and start time) are skipped.
+        """
+        run_ids = []
+        with self._connection:
+            for result in results:
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO runs (suite_title, suite_identifier, "
+                    "iut, test_run_start, passed, num_failed_tests, "
+                    "num_skipped_tests, num_passed_tests) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        result.suite_title,
+                        result.suite_identifier,
+                        get_iut(result),
+                        _serialize_datetime(result.test_run_start),
+                        result.passed,
+                        result.num_failed_tests,
+                        result.num_skipped_tests,
+                        result.num_passed_tests,
+                    )
+                )
+                if cursor.rowcount == 0:
+                    logger.info(
+                        f"Results of {result.suite_title!r} started at "
+                        f"{result.test_run_start} have already been stored"
+                    )
+                    continue
+                run_id = cursor.lastrowid
+                self._connection.executemany(
+                    "INSERT INTO test_cases (run_id, conformance_class, "
+                    "identifier, occurrence, status, detail) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    _gen_test_case_rows(run_id, result)
+                )
+                run_ids.append(run_id)
+        return run_ids
+
+    def list_runs(
+            self,
+            suite_title: str | None = None,
+            iut: str | None = None,
+            limit: int = 20,
+    ) -> list[StoredRun]:
+        where, params = _build_filters(suite_title=suite_title, iut=iut)
+        rows = self._connection.execute(
+            f"SELECT * FROM runs {where} ORDER BY test_run_start DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [StoredRun(**row) for row in rows]
+
+    def get_history(
+            self,
+            test_case_identifier: str,
+            suite_title: str | None = None,
+            iut: str | None = None,
+            limit: int = 20,
+    ) -> list[TestCaseOccurrence]:
+        """Get the most recent results of a test case, newest first."""
+        where, params = _build_filters(
+            test_case_identifier=test_case_identifier,
+            suite_title=suite_title,
+            iut=iut
+        )
+        rows = self._connection.execute(
+            f"SELECT tc.identifier, tc.status, tc.detail, tc.run_id, "
+            f"r.suite_title, r.iut, r.test_run_start "
+            f"FROM run_test_cases AS tc JOIN runs AS r ON r.id = tc.run_id "
+            f"{where} ORDER BY r.test_run_start DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [TestCaseOccurrence(**row) for row in rows]
+
+    def get_last_failure(
+            self,
+            test_case_identifier: str,
+            suite_title: str | None = None,
+            iut: str | None = None,
+    ) -> TestCaseOccurrence | None:
+        where, params = _build_filters(
+            test_case_identifier=test_case_identifier,
+            suite_title=suite_title,
+            iut=iut,
+            status=models.TestStatus.FAILED,
+        )
+        row = self._connection.execute(
+            f"SELECT tc.identifier, tc.status, tc.detail, tc.run_id, "
+            f"r.suite_title, r.iut, r.test_run_start "
+            f"FROM run_test_cases AS tc JOIN runs AS r ON r.id = tc.run_id "
+            f"{where} ORDER BY r.test_run_start DESC LIMIT 1",
+            params
+        ).fetchone()
+        return TestCaseOccurrence(**row) if row is not None else None
+
+    def get_failing_since(
+            self,
+            test_case_identifier: str,
+            suite_title: str | None = None,
+            iut: str | None = None,
+    ) -> TestCaseOccurrence | None:
+        """Get the first failure of the current streak of failures, if any."""
+        where, params = _build_filters(
+            test_case_identifier=test_case_identifier,
+            suite_title=suite_title,
+            iut=iut,
+        )
+        row = self._connection.execute(
+            f"WITH occurrences AS ("
+            f"  SELECT tc.identifier, tc.status, tc.detail, tc.run_id, "
+            f"  r.suite_title, r.iut, r.test_run_start "
+            f"  FROM run_test_cases AS tc JOIN runs AS r ON r.id = tc.run_id "
+            f"  {where}"
+            f"), last_non_failure AS ("
+            f"  SELECT max(test_run_start) AS test_run_start FROM occurrences "
+            f"  WHERE status != ?"
+            f") "
+            f"SELECT o.* FROM occurrences AS o, last_non_failure AS l "
+            f"WHERE o.status = ? AND ("
+            f"  l.test_run_start IS NULL OR o.test_run_start > l.test_run_start"
+            f") ORDER BY o.test_run_start ASC LIMIT 1",
+            (
+                *params,
+                models.TestStatus.FAILED.value,
+                models.TestStatus.FAILED.value
+            )
+        ).fetchone()
+        return TestCaseOccurrence(**row) if row is not None else None
+
+    def get_flaky_test_cases(
+            self,
+            suite_title: str | None = None,
+            iut: str | None = None,
+            num_recent_runs: int = 20,
+            min_status_changes: int = 2,
+    ) -> list[FlakyTestCase]:
+        """Find test cases whose status keeps changing between runs.
+
+        Only the `num_recent_runs` most recent runs of each suite and IUT are
+        considered.
+        """
+        where, params = _build_filters(suite_title=suite_title, iut=iut)
+        rows = self._connection.execute(
+            f"WITH recent_runs AS ("
+            f"  SELECT * FROM ("
+            f"    SELECT id, suite_title, iut, test_run_start, row_number() "
+            f"    OVER (PARTITION BY suite_title, iut "
+            f"          ORDER BY test_run_start DESC) AS run_rank "
+            f"    FROM runs {where}"
+            f"  ) WHERE run_rank <= ?"
+            f"), occurrences AS ("
+            f"  SELECT tc.identifier, tc.status, r.suite_title, r.iut, "
+            f"  lag(tc.status) OVER ("
+            f"    PARTITION BY tc.identifier, r.suite_title, r.iut "
+            f"    ORDER BY r.test_run_start"
+            f"  ) AS previous_status "
+            f"  FROM run_test_cases AS tc "
+            f"  JOIN recent_runs AS r ON r.id = tc.run_id"
+            f") "
+            f"SELECT identifier, suite_title, iut, count(*) AS num_runs, "
+            f"sum(previous_status IS NOT NULL AND status != previous_status) "
+            f"AS num_status_changes, "
+            f"sum(status = ?) AS num_failures "
+            f"FROM occurrences GROUP BY identifier, suite_title, iut "
+            f"HAVING num_status_changes >= ? "
+            f"ORDER BY num_status_changes DESC, identifier",
+            (
+                *params,
+                num_recent_runs,
+                models.TestStatus.FAILED.value,
+                min_status_changes
+            )
+        )
+        return [FlakyTestCase(**row) for row in rows]
+
+
+def _gen_test_case_rows(
+        run_id: int,
+        result: models.TestSuiteResult
+) -> Generator[tuple, None, None]:
+    for conformance_class in result.conformance_class_results:
+        occurrences = collections.Counter()
+        for test_case in conformance_class.tests:
+            occurrence = occurrences[test_case.identifier]
+            occurrences[test_case.identifier] += 1
+            yield (
+                run_id,
+                conformance_class.title,
+                test_case.identifier,
+                occurrence,
+                test_case.status.value,
+                test_case.detail,
+            )
+
+
+def get_iut(result: models.TestSuiteResult) -> str | None:
+    for suite_input in result.inputs:
+        if suite_input.name == "iut":
+            return suite_input.value
+    return None
+
+
+def _build_filters(
+        *,
+        test_case_identifier: str | None = None,
+        suite_title: str | None = None,
+        iut: str | None = None,
+        status: models.TestStatus | None = None,
+) -> tuple[str, tuple]:
+    """Build a WHERE clause out of the filters which are set.
+
+    Suite titles include the version of the executable test suite (_e.g._
+    `ogcapi-features-1.0-1.6`), so they are matched by prefix.
+    """
+    clauses = []
+    params = []
+    for clause, value, num_params in (
+            ("tc.identifier = ?", test_case_identifier, 1),
+            ("substr(suite_title, 1, length(?)) = ?", suite_title, 2),
+            ("iut = ?", iut, 1),
+            ("tc.status = ?", status.value if status is not None else None, 1),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.extend([value] * num_params)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), tuple(params)
+
+
+def _serialize_datetime(value: dt.datetime) -> str:
+    return value.astimezone(dt.timezone.utc).isoformat(timespec="microseconds")
@@ -0,0 +1,188 @@
+"""Columnar (Apache Arrow) export of test suite results.
+
+Results are flattened into one row per test case, which is much cheaper to
+load into dataframes than the nested JSON output. Columns with few distinct
+values (suite, conformance class, status, IUT) are dictionary-encoded.
+
+Tables can be written as a single Parquet or Arrow IPC file, or appended to a
+dataset directory that is hive-partitioned by suite title, which lets
+many runs accumulate in one place.
+
+This requires the optional `pyarrow` package.
+"""
+
+import enum
+import os
+import typing
+import uuid
+
+from .. import (
+    exceptions,
+    models,
+)
+from ..results_store import get_iut
+
+if typing.TYPE_CHECKING:
+    import pyarrow
+
+
+class ColumnarFormat(str, enum.Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+_PARTITION_COLUMN = "suite_title"
+_STATUSES = [status.value for status in models.TestStatus]
+
+
+def get_schema() -> "pyarrow.Schema":
+    pa = _import_pyarrow()
+    dictionary_string = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("suite_title", dictionary_string),
+        ("suite_identifier", pa.string()),
+        ("iut", dictionary_string),
+        ("test_run_start", pa.timestamp("us", tz="UTC")),
+        ("conformance_class", dictionary_string),
+        ("identifier", pa.string()),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("status", pa.dictionary(pa.int8(), pa.string())),
+        ("detail", pa.string()),
+    ])
+
+
+def to_table(*parsed_results: models.TestSuiteResult) -> "pyarrow.Table":
+    """Flatten test suite results into a table with one row per test case."""
+    pa = _import_pyarrow()
+    status_indexes = {status: index for index, status in enumerate(models.TestStatus)}
+    suite_titles = _DictionaryBuilder()
+    iuts = _DictionaryBuilder()
+    conformance_classes = _DictionaryBuilder()
+    columns: dict[str, list] = {
+        name: [] for name in (
+            "suite_identifier", "test_run_start", "identifier", "name",
+            "description", "status", "detail"
+        )
+    }
+    for parsed in parsed_results:
+        iut = get_iut(parsed)
+        for conformance_class in parsed.conformance_class_results:
+            num_tests = len(conformance_class.tests)
+            columns["suite_identifier"].extend([parsed.suite_identifier] * num_tests)
+            columns["test_run_start"].extend([parsed.test_run_start] * num_tests)
+            suite_titles.extend(parsed.suite_title, num_tests)
+            iuts.extend(iut, num_tests)
+            conformance_classes.extend(conformance_class.title, num_tests)
+            for test_case in conformance_class.tests:
+                columns["identifier"].append(test_case.identifier)
+                columns["name"].append(test_case.name)
+                columns["description"].append(test_case.description)
+                columns["status"].append(status_indexes[test_case.status])
+                columns["detail"].append(test_case.detail)
+    schema = get_schema()
+    arrays = {
+        "suite_title": suite_titles.build(),
+        "iut": iuts.build(),
+        "conformance_class": conformance_classes.build(),
+        "status": pa.DictionaryArray.from_arrays(
+            pa.array(columns.pop("status"), type=pa.int8()),
+            pa.array(_STATUSES, type=pa.string())
+        ),
+    }
+    for name, values in columns.items():
+        arrays[name] = pa.array(values, type=schema.field(name).type)
+    return pa.Table.from_arrays(
+        [arrays[field.name] for field in schema], schema=schema)
+
+
+def write_table(
+        table: "pyarrow.Table",
+        target: os.PathLike | str,
+        columnar_format: ColumnarFormat = ColumnarFormat.PARQUET,
+) -> None:
+    pa = _import_pyarrow()
+    if columnar_format == ColumnarFormat.PARQUET:
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, target)
+    else:
+        with pa.OSFile(str(target), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+def append_to_dataset(
+        table: "pyarrow.Table",
+        dataset_path: os.PathLike | str,
+        columnar_format: ColumnarFormat = ColumnarFormat.PARQUET,
+) -> None:
+    """Add the table's rows to a dataset that is partitioned by suite.
+
+    Each call writes new files, so existing data is never rewritten.
+    """
+    _import_pyarrow()
+    import pyarrow.dataset
+    pyarrow.dataset.write_dataset(
+        table,
+        dataset_path,
+        format="parquet" if columnar_format == ColumnarFormat.PARQUET else "ipc",
+        partitioning=_get_partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{columnar_format.value}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def read_dataset(
+        dataset_path: os.PathLike | str,
+        columnar_format: ColumnarFormat = ColumnarFormat.PARQUET,
+) -> "pyarrow.Table":
+    _import_pyarrow()
+    import pyarrow.dataset
+    return pyarrow.dataset.dataset(
+        dataset_path,
+        format="parquet" if columnar_format == ColumnarFormat.PARQUET else "ipc",
+        partitioning=pyarrow.dataset.HivePartitioning.discover(
+            infer_dictionary=True),
+    ).to_table()
+
+
+class _DictionaryBuilder:
+    """Accumulates dictionary indices for runs of repeated values."""
+
+    def __init__(self):
+        self._indexes: dict[str | None, int] = {}
+        self._values: list[str] = []
+        self._indices: list[int | None] = []
+
+    def extend(self, value: str | None, count: int) -> None:
+        if value is None:
+            index = None
+        elif (index := self._indexes.get(value)) is None:
+            index = self._indexes[value] = len(self._values)
+            self._values.append(value)
+        self._indices.extend([index] * count)
+
+    def build(self) -> "pyarrow.DictionaryArray":
+        pa = _import_pyarrow()
+        return pa.DictionaryArray.from_arrays(
+            pa.array(self._indices, type=pa.int32()),
+            pa.array(self._values, type=pa.string())
+        )
+
+
+def _get_partitioning() -> "pyarrow.dataset.Partitioning":
+    pa = _import_pyarrow()
+    import pyarrow.dataset
+    return pyarrow.dataset.partitioning(
+        pa.schema([get_schema().field(_PARTITION_COLUMN)]), flavor="hive")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise exceptions.OgcCiteActionException(
+            "Columnar export requires the optional 'pyarrow' package. "
+            "Install it with: pip install 'ogc-cite-action[columnar]'"
+        ) from exc
+    return pyarrow
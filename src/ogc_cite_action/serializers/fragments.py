@@ -0,0 +1,207 @@
+"""Per conformance class rendering of reports, with a cache of fragments.
+
+Templates render the sections of each conformance class by calling
+`render_fragment()` with the name of a macro, rather than inline. When the
+fragment cache is enabled, each rendered section is cached under a hash of
+the conformance class' contents and of the template, so that re-rendering a
+result in which only some conformance classes have changed only renders
+those again. Fragments are kept in memory and, if a directory is configured,
+on disk as well, which makes them available to later CLI invocations.
+
+Hashing a conformance class costs about as much as rendering it, so the
+cache only pays off when results are re-rendered and are mostly
+unchanged - as in daemon or watch mode. Each conformance class is hashed once
+per render, however many of its sections are rendered, and hashed again on
+every render, as results may have been changed in between. The cache is
+disabled by default.
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+
+import jinja2
+
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+_PRUNE_EVERY_NUM_WRITES = 128
+
+
+class FragmentCache:
+    """LRU cache of rendered fragments, optionally backed by a directory.
+
+    The directory is pruned of its oldest fragments whenever it grows
+    larger than `max_size_bytes`.
+    """
+
+    def __init__(
+            self,
+            max_size: int,
+            directory: str | None = None,
+            max_size_bytes: int = 50 * 1024 * 1024,
+    ):
+        self.max_size = max_size
+        self.directory = Path(directory) if directory is not None else None
+        self.max_size_bytes = max_size_bytes
+        self._items: collections.OrderedDict[str, str] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._num_writes = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if (fragment := self._items.get(key)) is not None:
+                self._items.move_to_end(key)
+                return fragment
+        if self.directory is not None:
+            try:
+                fragment = (self.directory / f"{key}.fragment").read_text("utf-8")
+            except OSError:
+                return None
+            self._set_in_memory(key, fragment)
+            return fragment
+        return None
+
+    def set(self, key: str, fragment: str) -> None:
+        self._set_in_memory(key, fragment)
+        if self.directory is not None:
+            self._write(key, fragment)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _set_in_memory(self, key: str, fragment: str) -> None:
+        with self._lock:
+            self._items[key] = fragment
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def _write(self, key: str, fragment: str) -> None:
+        try:
+            # write atomically, as other processes may be reading the directory
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(fragment)
+            os.replace(temp_path, self.directory / f"{key}.fragment")
+        except OSError as exc:
+            logger.warning(f"Could not write fragment to cache: {exc}")
+            return
+        with self._lock:
+            self._num_writes += 1
+            should_prune = self._num_writes % _PRUNE_EVERY_NUM_WRITES == 0
+        if should_prune:
+            self._prune()
+
+    def _prune(self) -> None:
+        entries = []
+        for entry in self.directory.glob("*.fragment"):
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat_result.st_mtime, stat_result.st_size, entry))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            logger.debug(f"Evicting {entry} from fragment cache")
+            entry.unlink(missing_ok=True)
+            total_size -= size
+
+
+@jinja2.pass_context
+class FragmentRenderer:
+    """Renders a template macro for a conformance class, going through the cache.
+
+    This is made available to templates as the `render_fragment` global.
+    """
+
+    def __init__(
+            self,
+            environment: jinja2.Environment,
+            cache: FragmentCache | None = None,
+    ):
+        self.environment = environment
+        self.cache = cache
+        self._template_fingerprints: dict[str, str | None] = {}
+        # fingerprints of the conformance classes being rendered, keyed by id,
+        # as each one is rendered into several sections. They only live as
+        # long as the render's context, during which the result is not changed
+        self._class_fingerprints: weakref.WeakKeyDictionary[
+            jinja2.runtime.Context, dict[int, str]
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def __call__(
+            self,
+            context: jinja2.runtime.Context,
+            template_name: str,
+            macro_name: str,
+            conformance_class: models.ConformanceClassResult,
+    ) -> str:
+        macro = getattr(
+            self.environment.get_template(template_name).module, macro_name)
+        template_fingerprint = self._get_template_fingerprint(template_name)
+        if self.cache is None or template_fingerprint is None:
+            return macro(conformance_class)
+        key = hashlib.sha256(
+            "\0".join((
+                template_fingerprint,
+                macro_name,
+                self._get_class_fingerprint(context, conformance_class),
+            )).encode()
+        ).hexdigest()
+        if (fragment := self.cache.get(key)) is None:
+            fragment = str(macro(conformance_class))
+            self.cache.set(key, fragment)
+        return fragment
+
+    def _get_class_fingerprint(
+            self,
+            context: jinja2.runtime.Context,
+            conformance_class: models.ConformanceClassResult
+    ) -> str:
+        with self._lock:
+            fingerprints = self._class_fingerprints.setdefault(context, {})
+        key = id(conformance_class)
+        if (fingerprint := fingerprints.get(key)) is None:
+            fingerprint = fingerprints[key] = get_fingerprint(conformance_class)
+        return fingerprint
+
+    def _get_template_fingerprint(self, template_name: str) -> str | None:
+        """Get a hash of the template's source, if the loader provides it.
+
+        Fragments of templates whose source is not available are not cached.
+        Templates are only fingerprinted once, so a long-running process does
+        not notice when they are edited.
+        """
+        if template_name not in self._template_fingerprints:
+            try:
+                source = self.environment.loader.get_source(
+                    self.environment, template_name)[0]
+            except (RuntimeError, TypeError):
+                logger.debug(
+                    f"Template {template_name!r} has no source - its "
+                    f"fragments will not be cached"
+                )
+                fingerprint = None
+            else:
+                fingerprint = hashlib.sha256(source.encode()).hexdigest()
+            self._template_fingerprints[template_name] = fingerprint
+        return self._template_fingerprints[template_name]
+
+
+def get_fingerprint(conformance_class: models.ConformanceClassResult) -> str:
+    """Get a hash of everything that a conformance class' fragments can show."""
+    return hashlib.sha256(
+        conformance_class.__pydantic_serializer__.to_json(conformance_class)
+    ).hexdigest()
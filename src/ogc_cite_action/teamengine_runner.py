@@ -1,6 +1,6 @@
 """Utilities for running a remote TEAMENGINE instance and getting its result."""
-import importlib
 import logging
+import os
 import time
 import typing
 from lxml import etree
@@ -10,14 +10,24 @@ import jinja2
 import pydantic
 
 from . import (
+    compression,
     config,
     exceptions,
+    instrumentation,
     models,
+    plugins,
+)
+from .parsers import (
+    earl,
+    earl_parallel,
 )
 
 logger = logging.getLogger(__name__)
 
 
+RawSuiteResult = typing.Union[str, bytes, os.PathLike, typing.BinaryIO]
+
+
 class SuiteParserProtocol(typing.Protocol):
 
     def __call__(
@@ -39,6 +49,132 @@ class SuiteSerializerProtocol(typing.Protocol):
         ...
 
 
+class RetryingTransport(httpx.BaseTransport):
+    """Transport that retries requests on transient failures.
+
+    Requests are retried when a connection to the server could not be
+    established, which is safe whatever the request, as it never reached the
+    server. Idempotent requests are also retried when the response has one of
+    the configured status codes (typically 502/503/504, as returned by
+    proxies sitting in front of teamengine). Other errors, like read
+    timeouts, are not retried, as the server may still be processing the
+    request. Requests can opt out of being treated as idempotent with the
+    `idempotent` request extension, or out of retries altogether with the
+    `retry` request extension. Waits between attempts grow exponentially
+    and honor a numeric `Retry-After` header, if present, up to
+    `max_wait_seconds`.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+    # errors which are raised before the request is sent
+    RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+    def __init__(
+            self,
+            wrapped: httpx.BaseTransport,
+            max_retries: int = 3,
+            backoff_seconds: float = 2,
+            retry_status_codes: typing.Collection[int] = (502, 503, 504),
+            max_wait_seconds: float = 60,
+    ):
+        self.wrapped = wrapped
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.max_wait_seconds = max_wait_seconds
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.extensions.get("retry", True):
+            return self.wrapped.handle_request(request)
+        can_retry = (
+            request.method in self.IDEMPOTENT_METHODS
+            and request.extensions.get("idempotent", True)
+        )
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.wrapped.handle_request(request)
+            except httpx.TransportError as exc:
+                logger.debug(
+                    f"{request.method} {request.url} failed after "
+                    f"{time.perf_counter() - start:.3f}s: {exc!r}"
+                )
+                if (
+                        not isinstance(exc, self.RETRYABLE_ERRORS)
+                        or attempt >= self.max_retries
+                ):
+                    raise
+                wait_seconds = self._get_wait_seconds(attempt)
+            else:
+                logger.debug(
+                    f"{request.method} {request.url} -> {response.status_code} "
+                    f"in {time.perf_counter() - start:.3f}s"
+                )
+                if (
+                        not can_retry
+                        or attempt >= self.max_retries
+                        or response.status_code not in self.retry_status_codes
+                ):
+                    return response
+                wait_seconds = self._get_wait_seconds(
+                    attempt, response.headers.get("Retry-After"))
+                response.close()
+            attempt += 1
+            logger.info(
+                f"Retrying {request.method} {request.url} in {wait_seconds}s "
+                f"(attempt {attempt} of {self.max_retries})..."
+            )
+            time.sleep(wait_seconds)
+
+    def close(self) -> None:
+        self.wrapped.close()
+
+    def _get_wait_seconds(
+            self, attempt: int, retry_after: str | None = None) -> float:
+        if retry_after is not None and retry_after.isdigit():
+            wait_seconds = float(retry_after)
+        else:
+            wait_seconds = self.backoff_seconds * 2 ** attempt
+        return min(wait_seconds, self.max_wait_seconds)
+
+
+def get_http_client(
+        network_settings: config.NetworkSettings,
+        network_timeout_seconds: float,
+        transport: httpx.BaseTransport | None = None,
+) -> httpx.Client:
+    """Build an HTTP client suitable for talking with teamengine.
+
+    `network_timeout_seconds` is used for reading and writing data, which may
+    take a long time when teamengine is executing a test suite, whereas
+    connecting and acquiring a connection from the pool use the (shorter)
+    values that are defined in the network settings.
+    """
+    limits = httpx.Limits(
+        max_connections=network_settings.max_connections,
+        max_keepalive_connections=network_settings.max_keepalive_connections,
+    )
+    return httpx.Client(
+        timeout=httpx.Timeout(
+            connect=network_settings.connect_timeout_seconds,
+            read=network_timeout_seconds,
+            write=network_timeout_seconds,
+            pool=network_settings.pool_timeout_seconds,
+        ),
+        limits=limits,
+        headers={
+            "Accept-Encoding": "gzip, deflate",
+        },
+        transport=RetryingTransport(
+            transport or httpx.HTTPTransport(limits=limits),
+            max_retries=network_settings.max_retries,
+            backoff_seconds=network_settings.retry_backoff_seconds,
+            retry_status_codes=network_settings.retry_status_codes,
+            max_wait_seconds=network_settings.retry_max_wait_seconds,
+        ),
+    )
+
 
 def wait_for_teamengine_to_be_ready(
     client: httpx.Client,
@@ -49,8 +185,14 @@ def wait_for_teamengine_to_be_ready(
     current_attempt = 1
     result = False
     while current_attempt <= num_attempts:
-        response = client.get(f"{teamengine_base_url}/")
-        if response.status_code == 200:
+        try:
+            # this loop already retries, with its own waits
+            response = client.get(
+                f"{teamengine_base_url}/", extensions={"retry": False})
+        except httpx.TransportError as exc:
+            logger.debug(f"Could not contact teamengine: {exc!r}")
+            response = None
+        if response is not None and response.status_code == 200:
             result = True
             break
         else:
@@ -67,6 +209,35 @@ def wait_for_teamengine_to_be_ready(
     return result
 
 
+def run_test_suite(
+    client: httpx.Client,
+    teamengine_base_url: str,
+    test_suite_identifier: str,
+    *,
+    test_suite_arguments: typing.Optional[dict[str, list[str]]] = None,
+    teamengine_username: pydantic.SecretStr | None = None,
+    teamengine_password: pydantic.SecretStr | None = None,
+) -> bytes:
+    """Wait for teamengine to become ready and then execute a test suite."""
+    base_url = teamengine_base_url.strip("/")
+    with instrumentation.phase("wait-for-teamengine"):
+        is_ready = wait_for_teamengine_to_be_ready(client, base_url)
+    if not is_ready:
+        raise exceptions.OgcCiteActionException(
+            "teamengine service is not available")
+    logger.debug(
+        f"Asking teamengine to execute test suite {test_suite_identifier!r}...")
+    with instrumentation.phase("execute-test-suite"):
+        return execute_test_suite(
+            client,
+            base_url,
+            test_suite_identifier,
+            test_suite_arguments=test_suite_arguments,
+            teamengine_username=teamengine_username,
+            teamengine_password=teamengine_password,
+        )
+
+
 def execute_test_suite(
     client: httpx.Client,
     teamengine_base_url: str,
@@ -75,7 +246,12 @@ def execute_test_suite(
     test_suite_arguments: typing.Optional[dict[str, list[str]]] = None,
     teamengine_username: pydantic.SecretStr | None = None,
     teamengine_password: pydantic.SecretStr | None = None,
-) -> typing.Optional[str]:
+) -> bytes:
+    """Execute a test suite and return teamengine's raw response body.
+
+    The response is returned as bytes, which can be handed directly to the
+    XML parser, which takes care of the document's encoding.
+    """
     request_auth = (
         teamengine_username.get_secret_value(),
         teamengine_password.get_secret_value()
@@ -86,27 +262,64 @@ def execute_test_suite(
         auth=request_auth,
         headers={
             "Accept": "application/rdf+xml",
-        }
+        },
+        # retrying would start the suite again, while teamengine may still be
+        # executing it
+        extensions={"idempotent": False},
     )
     try:
         response.raise_for_status()
     except httpx.HTTPError as exc:
         raise exceptions.OgcCiteActionException("Could not execute test suite") from exc
     else:
-        return response.text
+        return response.content
 
 
 def parse_test_suite_result(
-        raw_result: str,
+        raw_result: RawSuiteResult,
         settings: config.TeamEngineRunnerSettings,
         treat_skipped_as_failure: bool,
         test_suite_identifier: str | None = None,
+        num_workers: int | None = None,
 ) -> models.TestSuiteResult:
-    root_element = _parse_raw_result_as_xml(raw_result)
-    parser: SuiteParserProtocol = _get_suite_result_parser(
-        settings, test_suite_identifier)
-    return parser(
-        root_element, treat_skipped_as_failure=treat_skipped_as_failure)
+    """Parse a raw test suite result.
+
+    The parser is picked by `test_suite_identifier`. When it is not known and
+    suite-specific parsers are configured, it is taken from the document.
+
+    When more than one worker is requested (either via `num_workers` or the
+    `parse_workers` setting) and the default EARL parser is in use, the
+    document's assertions are parsed in parallel by a pool of processes.
+    """
+    num_workers = num_workers or settings.parse_workers
+    if (
+            test_suite_identifier is None
+            and plugins.get_registry(settings).has_suite_parsers
+    ):
+        with instrumentation.phase("xml-parse", profile=True):
+            root_element = _parse_raw_result_as_xml(raw_result)
+        test_suite_identifier = earl.get_test_suite_identifier(root_element)
+        logger.debug(f"Detected test suite {test_suite_identifier!r}")
+        parser: SuiteParserProtocol = _get_suite_result_parser(
+            settings, test_suite_identifier)
+        # the document has already been parsed, so it is not parsed again
+        # in parallel
+        with instrumentation.phase("model-build", profile=True):
+            return parser(
+                root_element, treat_skipped_as_failure=treat_skipped_as_failure)
+    parser = _get_suite_result_parser(settings, test_suite_identifier)
+    if num_workers > 1 and parser is earl.parse_test_suite_result:
+        with instrumentation.phase("parallel-parse", profile=True):
+            return earl_parallel.parse_test_suite_result(
+                _read_raw_result(raw_result),
+                treat_skipped_as_failure,
+                num_workers
+            )
+    with instrumentation.phase("xml-parse", profile=True):
+        root_element = _parse_raw_result_as_xml(raw_result)
+    with instrumentation.phase("model-build", profile=True):
+        return parser(
+            root_element, treat_skipped_as_failure=treat_skipped_as_failure)
 
 
 def serialize_suite_result(
@@ -118,26 +331,8 @@ def serialize_suite_result(
     serializer: SuiteSerializerProtocol = _get_suite_result_serializer(
         output_format, settings, parsed_suite_result.suite_title
     )
-    return serializer(parsed_suite_result, settings, jinja_env)
-
-
-def _sanitize_test_suite_identifier(raw_identifier: str) -> str:
-    return raw_identifier.translate(
-        str.maketrans(
-            {
-                ".": "_",
-                "-": "_",
-            }
-        )
-    )
-
-
-def _load_python_object(
-        object_path: str
-) -> typing.Union[typing.Type, typing.Callable] | None:
-    module_path, parser_name = object_path.rpartition(".")[::2]
-    module = importlib.import_module(module_path)
-    return getattr(module, parser_name)
+    with instrumentation.phase(f"serialize-{output_format.value}", profile=True):
+        return serializer(parsed_suite_result, settings, jinja_env)
 
 
 def _get_suite_result_serializer(
@@ -145,60 +340,66 @@ def _get_suite_result_serializer(
     settings: config.TeamEngineRunnerSettings,
     test_suite_identifier: str | None = None,
 ) -> SuiteSerializerProtocol:
-    serializer_python_path = {
-        output_format.JSON: settings.default_json_serializer,
-        output_format.MARKDOWN: settings.default_markdown_serializer,
-    }.get(output_format)
-    if test_suite_identifier is not None:
-        settings_key = "_".join((
-            _sanitize_test_suite_identifier(test_suite_identifier),
-            output_format.value,
-            "serializer"
-        ))
-        if (custom_serializer_path := getattr(settings, settings_key, None)) is not None:
-            serializer_python_path = custom_serializer_path
-        else:
-            logger.info(
-                f"Could not find python path for custom serializer based on "
-                f"test suite identifier {test_suite_identifier!r} - using "
-                f"default serializer of {serializer_python_path!r}")
-    return _load_python_object(serializer_python_path)
+    return plugins.get_registry(settings).get_serializer(
+        output_format, test_suite_identifier)
 
 
 def _get_suite_result_parser(
     settings: config.TeamEngineRunnerSettings,
     test_suite_identifier: str | None = None,
 ) -> SuiteParserProtocol:
-    parser_python_path = settings.default_parser
-    if test_suite_identifier is not None:
-        settings_key = "_".join((
-            _sanitize_test_suite_identifier(test_suite_identifier),
-            "parser"
-        ))
-        if (custom_parser_path := getattr(settings, settings_key, None)) is not None:
-            parser_python_path = custom_parser_path
-        else:
-            logger.info(
-                f"Could not find python path for custom parser based on test "
-                f"suite with identifier {test_suite_identifier!r} - using "
-                f"default parser of {parser_python_path!r}"
-            )
-    return _load_python_object(parser_python_path)
+    return plugins.get_registry(settings).get_parser(test_suite_identifier)
 
 
 def _parse_raw_result_as_xml(
-        raw_result: str
+        raw_result: RawSuiteResult
 ) -> etree.Element:
+    """Parse the raw result as XML.
+
+    Bytes, paths and binary file objects are handed as-is to lxml, which
+    reads them directly and detects their encoding from the XML declaration.
+    Compressed files are decompressed on the fly while being parsed. Strings
+    are still supported, but they need to be encoded first.
+    """
     parser = etree.XMLParser(
         resolve_entities=False,
     )
     try:
-        return etree.fromstring(raw_result.encode(), parser)
-    except etree.ParseError as exc:
+        if isinstance(raw_result, str):
+            return etree.fromstring(raw_result.encode(), parser)
+        elif isinstance(raw_result, bytes):
+            return etree.fromstring(raw_result, parser)
+        elif isinstance(raw_result, os.PathLike):
+            if (
+                    compression.detect_compression(raw_result)
+                    == compression.Compression.NONE
+            ):
+                return etree.parse(os.fspath(raw_result), parser).getroot()
+            with compression.open_raw_result(raw_result) as fh:
+                return etree.parse(fh, parser).getroot()
+        else:
+            return etree.parse(raw_result, parser).getroot()
+    except (etree.ParseError, OSError, EOFError) as exc:
         raise exceptions.OgcCiteActionException(
             "Unable to parse test suite execution result as XML") from exc
 
 
+def _read_raw_result(raw_result: RawSuiteResult) -> bytes:
+    try:
+        if isinstance(raw_result, str):
+            return raw_result.encode()
+        elif isinstance(raw_result, bytes):
+            return raw_result
+        elif isinstance(raw_result, os.PathLike):
+            with compression.open_raw_result(raw_result) as fh:
+                return fh.read()
+        else:
+            return raw_result.read()
+    except (OSError, EOFError) as exc:
+        raise exceptions.OgcCiteActionException(
+            "Unable to read test suite execution result") from exc
+
+
 def get_suite_name(
         result_root: etree.Element,
 ) -> str:
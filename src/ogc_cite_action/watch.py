@@ -0,0 +1,264 @@
+"""Re-run a test suite whenever the implementation under test (IUT) changes.
+
+The IUT is fingerprinted by hashing its landing page, conformance document
+and OpenAPI document. These are fetched with conditional requests
+(`If-None-Match`/`If-Modified-Since`), so polling an unchanged IUT mostly
+costs a few `304 Not Modified` responses. The suite is only executed when
+the fingerprint changes, and each new result is compared with the previous
+one, so that only the test cases whose status changed need to be reported.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import typing
+import urllib.parse
+
+import httpx
+import pydantic
+
+from . import (
+    config,
+    exceptions,
+    models,
+    teamengine_runner,
+)
+
+logger = logging.getLogger(__name__)
+
+_OPENAPI_LINK_RELATIONS = (
+    "service-desc",
+    "http://www.opengis.net/def/rel/ogc/1.0/service-desc",
+)
+
+
+class StatusChange(pydantic.BaseModel):
+    conformance_class: str
+    identifier: str
+    previous_status: models.TestStatus | None
+    status: models.TestStatus | None
+    detail: str | None = None
+
+
+class WatchRun(pydantic.BaseModel):
+    fingerprint: str
+    result: models.TestSuiteResult
+    changes: list[StatusChange]
+    is_first_run: bool
+
+
+class _CachedDocument(typing.NamedTuple):
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    content: bytes
+
+
+class IutFingerprinter:
+    """Computes a fingerprint of the IUT's landing, conformance and API documents."""
+
+    def __init__(self, client: httpx.Client, iut_url: str):
+        self.client = client
+        self.iut_url = iut_url.rstrip("/")
+        self._documents: dict[str, _CachedDocument] = {}
+
+    def get_fingerprint(self) -> str | None:
+        """Get the IUT's fingerprint, or None if any document is unavailable.
+
+        An IUT that cannot be reached, or that responds with a server error,
+        has not necessarily changed, so it is not fingerprinted at all.
+        """
+        landing_page_url = f"{self.iut_url}/"
+        if (landing_page_digest := self._get_digest(landing_page_url)) is None:
+            return None
+        digests = [landing_page_digest]
+        for url in (
+                f"{self.iut_url}/conformance",
+                self._get_openapi_url(landing_page_url),
+        ):
+            if (digest := self._get_digest(url)) is None:
+                return None
+            digests.append(digest)
+        return hashlib.sha256("\n".join(digests).encode()).hexdigest()
+
+    def _get_digest(self, url: str) -> str | None:
+        cached = self._documents.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag is not None:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified is not None:
+                headers["If-Modified-Since"] = cached.last_modified
+        try:
+            response = self.client.get(url, headers=headers)
+        except httpx.HTTPError as exc:
+            logger.warning(f"Could not fetch {url!r}: {exc}")
+            return None
+        if response.status_code == httpx.codes.NOT_MODIFIED and cached is not None:
+            return cached.digest
+        if response.is_server_error:
+            logger.warning(
+                f"Could not fetch {url!r}: status {response.status_code}")
+            return None
+        if response.is_error:
+            # a client error, e.g. a missing OpenAPI document, is part of the
+            # IUT's state too
+            return f"{url} {response.status_code}"
+        digest = hashlib.sha256(response.content).hexdigest()
+        self._documents[url] = _CachedDocument(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            digest=digest,
+            content=response.content,
+        )
+        return digest
+
+    def _get_openapi_url(self, landing_page_url: str) -> str:
+        if (landing_page := self._documents.get(landing_page_url)) is not None:
+            for link in _get_links(landing_page.content):
+                if (
+                        link.get("rel") in _OPENAPI_LINK_RELATIONS
+                        and isinstance(href := link.get("href"), str)
+                ):
+                    # links may be relative to the landing page
+                    return urllib.parse.urljoin(landing_page_url, href)
+        return f"{self.iut_url}/api"
+
+
+class Watcher:
+    """Executes a test suite whenever the IUT's fingerprint changes."""
+
+    def __init__(
+            self,
+            client: httpx.Client,
+            settings: config.TeamEngineRunnerSettings,
+            teamengine_base_url: str,
+            test_suite_identifier: str,
+            test_suite_inputs: dict[str, list[str]],
+            *,
+            teamengine_username: pydantic.SecretStr | None = None,
+            teamengine_password: pydantic.SecretStr | None = None,
+            treat_skipped_tests_as_failures: bool = True,
+    ):
+        if not (iut_urls := test_suite_inputs.get("iut")):
+            raise exceptions.OgcCiteActionException(
+                "Cannot watch an IUT without an 'iut' test suite input")
+        self.client = client
+        self.settings = settings
+        self.teamengine_base_url = teamengine_base_url
+        self.test_suite_identifier = test_suite_identifier
+        self.test_suite_inputs = test_suite_inputs
+        self.teamengine_username = teamengine_username
+        self.teamengine_password = teamengine_password
+        self.treat_skipped_tests_as_failures = treat_skipped_tests_as_failures
+        self.fingerprinter = IutFingerprinter(client, iut_urls[0])
+        self.fingerprint: str | None = None
+        self.result: models.TestSuiteResult | None = None
+
+    def poll(self) -> WatchRun | None:
+        """Execute the test suite if the IUT changed since the previous run."""
+        fingerprint = self.fingerprinter.get_fingerprint()
+        if fingerprint is None:
+            logger.warning(
+                "IUT is unavailable - skipping this poll, the test suite runs "
+                "once the IUT is back and has changed"
+            )
+            return None
+        if fingerprint == self.fingerprint:
+            logger.debug("IUT has not changed")
+            return None
+        logger.info(
+            f"IUT fingerprint changed to {fingerprint[:12]} - executing "
+            f"test suite {self.test_suite_identifier!r}..."
+        )
+        raw_result = teamengine_runner.run_test_suite(
+            self.client,
+            self.teamengine_base_url,
+            self.test_suite_identifier,
+            test_suite_arguments=self.test_suite_inputs,
+            teamengine_username=self.teamengine_username,
+            teamengine_password=self.teamengine_password,
+        )
+        result = teamengine_runner.parse_test_suite_result(
+            raw_result,
+            self.settings,
+            self.treat_skipped_tests_as_failures,
+            test_suite_identifier=self.test_suite_identifier,
+        )
+        run = WatchRun(
+            fingerprint=fingerprint,
+            result=result,
+            changes=(
+                diff_results(self.result, result)
+                if self.result is not None else []
+            ),
+            is_first_run=self.result is None,
+        )
+        # the fingerprint is only stored once the suite ran successfully, so
+        # that a failed run gets retried on the next poll
+        self.fingerprint = fingerprint
+        self.result = result
+        return run
+
+
+def diff_results(
+        previous: models.TestSuiteResult,
+        current: models.TestSuiteResult,
+) -> list[StatusChange]:
+    """Find the test cases whose status differs between two results.
+
+    Test cases are matched by conformance class, identifier and occurrence,
+    as the same test case may be run more than once.
+    """
+    previous_statuses = {
+        key: test_case.status
+        for key, test_case in _gen_keyed_test_cases(previous)
+    }
+    changes = []
+    for key, test_case in _gen_keyed_test_cases(current):
+        previous_status = previous_statuses.pop(key, None)
+        if previous_status != test_case.status:
+            changes.append(
+                StatusChange(
+                    conformance_class=key[0],
+                    identifier=key[1],
+                    previous_status=previous_status,
+                    status=test_case.status,
+                    detail=test_case.detail,
+                )
+            )
+    for (conformance_class, identifier, _), previous_status in (
+            previous_statuses.items()):
+        changes.append(
+            StatusChange(
+                conformance_class=conformance_class,
+                identifier=identifier,
+                previous_status=previous_status,
+                status=None,
+            )
+        )
+    return changes
+
+
+def _gen_keyed_test_cases(
+        result: models.TestSuiteResult
+) -> typing.Generator[
+    tuple[tuple[str, str, int], models.TestCaseResult], None, None
+]:
+    for conformance_class in result.conformance_class_results:
+        occurrences = collections.Counter()
+        for test_case in conformance_class.tests:
+            occurrence = occurrences[test_case.identifier]
+            occurrences[test_case.identifier] += 1
+            yield (conformance_class.title, test_case.identifier, occurrence), test_case
+
+
+def _get_links(document: bytes) -> list[dict]:
+    try:
+        links = json.loads(document).get("links", [])
+    except (ValueError, AttributeError):
+        return []
+    if not isinstance(links, list):
+        return []
+    return [link for link in links if isinstance(link, dict)]
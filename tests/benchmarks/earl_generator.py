@@ -0,0 +1,291 @@
+"""Generate synthetic teamengine EARL results of arbitrary size.
+
+The generated documents mirror the structure of the real teamengine responses
+that are stored in `tests/data`:
+
+- a root `rdf:RDF` element with the same namespace declarations
+- a `cite:TestRun` with summary counts, suite inputs and one
+  `earl:TestRequirement` per conformance class, whose `dct:hasPart` children
+  either reference a test case or define it inline
+- one `earl:Assertion` per test case, whose `earl:test` likewise either
+  references the test case or defines it inline, and whose result may embed
+  the HTTP response body that was received by the test
+"""
+
+import dataclasses
+import datetime as dt
+import random
+from pathlib import Path
+from xml.sax.saxutils import (
+    escape,
+    quoteattr,
+)
+
+_NAMESPACES = {
+    "dct": "http://purl.org/dc/terms/",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "http": "http://www.w3.org/2011/http#",
+    "cnt": "http://www.w3.org/2011/content#",
+    "earl": "http://www.w3.org/ns/earl#",
+    "cite": "http://cite.opengeospatial.org/",
+}
+_XSD = "http://www.w3.org/2001/XMLSchema#"
+_BASE_DATE = dt.datetime(2025, 3, 18, 15, 46, 38, tzinfo=dt.timezone.utc)
+
+
+@dataclasses.dataclass(frozen=True)
+class EarlGeneratorConfig:
+    num_assertions: int = 1000
+    num_conformance_classes: int = 5
+    failure_ratio: float = 0.05
+    skip_ratio: float = 0.02
+    num_distinct_failure_details: int = 20
+    http_body_ratio: float = 0.1
+    http_body_size: int = 2048
+    seed: int = 42
+    suite_title: str = "ogcapi-features-1.0-1.6"
+    suite_identifier: str = "s0007"
+
+
+@dataclasses.dataclass(frozen=True)
+class _TestCase:
+    identifier: str
+    title: str
+    description: str
+    conformance_class: str
+    outcome: str
+    detail: str | None
+    http_body: str | None
+    define_in_requirement: bool
+
+
+def generate_earl_document(config: EarlGeneratorConfig) -> str:
+    """Generate an EARL document, as returned by teamengine."""
+    return "".join(_gen_document(config))
+
+
+def write_earl_document(config: EarlGeneratorConfig, target: Path) -> Path:
+    with target.open("w", encoding="utf-8") as fh:
+        fh.writelines(_gen_document(config))
+    return target
+
+
+def _gen_document(config: EarlGeneratorConfig):
+    test_cases = _generate_test_cases(config)
+    namespaces = "\n".join(
+        f"        xmlns:{prefix}={quoteattr(uri)}"
+        for prefix, uri in _NAMESPACES.items()
+    )
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<rdf:RDF\n{namespaces}\n>\n'
+    half = len(test_cases) // 2
+    # like teamengine, put the test run somewhere among the assertions
+    for index, test_case in enumerate(test_cases[:half]):
+        yield _render_assertion(index, test_case)
+    yield _render_test_run(config, test_cases)
+    for index, test_case in enumerate(test_cases[half:], start=half):
+        yield _render_assertion(index, test_case)
+    yield "</rdf:RDF>"
+
+
+def _generate_test_cases(config: EarlGeneratorConfig) -> list[_TestCase]:
+    rng = random.Random(config.seed)
+    conformance_classes = [
+        f"Conformance Class {index}"
+        for index in range(config.num_conformance_classes)
+    ]
+    failure_details = [
+        f"java.lang.AssertionError: Expected status code 200 but received "
+        f"{rng.choice((400, 404, 500))} for request to "
+        f"http://localhost:5000/collections/collection-{index}/items"
+        for index in range(max(config.num_distinct_failure_details, 1))
+    ]
+    body_chunk = '{"type": "FeatureCollection", "features": []}\n'
+    http_body = (
+        body_chunk * (config.http_body_size // len(body_chunk) + 1)
+    )[:config.http_body_size]
+    test_cases = []
+    for index in range(config.num_assertions):
+        conformance_class = conformance_classes[
+            index % config.num_conformance_classes]
+        roll = rng.random()
+        if roll < config.failure_ratio:
+            outcome = "failed"
+            detail = rng.choice(failure_details)
+        elif roll < config.failure_ratio + config.skip_ratio:
+            outcome = "untested"
+            detail = "No details available."
+        else:
+            outcome = "passed"
+            detail = None
+        package = conformance_class.lower().replace(" ", "")
+        test_cases.append(
+            _TestCase(
+                identifier=(
+                    f"org/opengis/cite/synthetic/{package}/"
+                    f"Tests{index // 10}#verifyThing{index}"
+                ),
+                title=f"verify Thing {index} ",
+                description=(
+                    f"Implements Abstract Test {index} "
+                    f"(Requirement /req/{package}/thing-{index})"
+                ),
+                conformance_class=conformance_class,
+                outcome=outcome,
+                detail=detail,
+                http_body=(
+                    http_body if rng.random() < config.http_body_ratio else None
+                ),
+                define_in_requirement=rng.random() < 0.5,
+            )
+        )
+    return test_cases
+
+
+def _render_test_case(test_case: _TestCase, indent: str) -> str:
+    return (
+        f"{indent}<earl:TestCase rdf:about={quoteattr(test_case.identifier)}>\n"
+        f"{indent}  <dct:title>{escape(test_case.title)}</dct:title>\n"
+        f"{indent}  <dct:description>{escape(test_case.description)}"
+        f"</dct:description>\n"
+        f"{indent}</earl:TestCase>\n"
+    )
+
+
+def _render_assertion(index: int, test_case: _TestCase) -> str:
+    date = (_BASE_DATE + dt.timedelta(milliseconds=index)).isoformat(
+        timespec="milliseconds").replace("+00:00", "Z")
+    parts = [
+        f'  <earl:Assertion rdf:about="assert-{index}">\n'
+        f'    <earl:mode rdf:resource="http://www.w3.org/ns/earl#automatic"/>\n'
+        f'    <earl:assertedBy rdf:resource="https://github.com/opengeospatial/teamengine"/>\n'
+        f'    <earl:subject rdf:resource="http://localhost:5000"/>\n'
+        f'    <earl:result>\n'
+        f'      <earl:TestResult rdf:about="result-{index}">\n'
+        f'        <dct:date rdf:datatype="{_XSD}dateTime">{date}</dct:date>\n'
+    ]
+    if test_case.detail is not None:
+        parts.append(
+            f"        <dct:description>{escape(test_case.detail)}"
+            f"</dct:description>\n"
+        )
+    parts.append(
+        f'        <earl:outcome rdf:resource="http://www.w3.org/ns/earl#'
+        f'{test_case.outcome}"/>\n'
+    )
+    if test_case.http_body is not None:
+        parts.append(
+            f"        <cite:message>\n"
+            f"          <http:Request>\n"
+            f"            <http:resp>\n"
+            f"              <http:Response>\n"
+            f"                <http:body>\n"
+            f"                  <cnt:ContentAsXML>\n"
+            f"                    <cnt:rest>HTTP/1.1 200 OK\n"
+            f"Content-Type: application/json\n\n"
+            f"{escape(test_case.http_body)}</cnt:rest>\n"
+            f"                  </cnt:ContentAsXML>\n"
+            f"                </http:body>\n"
+            f"              </http:Response>\n"
+            f"            </http:resp>\n"
+            f"            <http:methodName>GET</http:methodName>\n"
+            f"          </http:Request>\n"
+            f"        </cite:message>\n"
+        )
+    parts.append(
+        "      </earl:TestResult>\n"
+        "    </earl:result>\n"
+    )
+    if test_case.define_in_requirement:
+        parts.append(
+            f"    <earl:test rdf:resource={quoteattr(test_case.identifier)}/>\n"
+        )
+    else:
+        parts.append(
+            f"    <earl:test>\n"
+            f"{_render_test_case(test_case, '      ')}"
+            f"    </earl:test>\n"
+        )
+    parts.append("  </earl:Assertion>\n")
+    return "".join(parts)
+
+
+def _render_test_run(
+        config: EarlGeneratorConfig,
+        test_cases: list[_TestCase]
+) -> str:
+    by_class: dict[str, list[_TestCase]] = {}
+    for test_case in test_cases:
+        by_class.setdefault(test_case.conformance_class, []).append(test_case)
+    parts = [
+        "  <cite:TestRun>\n"
+        "    <cite:requirements>\n"
+        "      <rdf:Seq>\n"
+    ]
+    for conformance_class, class_test_cases in by_class.items():
+        parts.append(
+            f"        <rdf:li>\n"
+            f"          <earl:TestRequirement "
+            f"rdf:about={quoteattr(conformance_class.replace(' ', '-'))}>\n"
+        )
+        for test_case in class_test_cases:
+            if test_case.define_in_requirement:
+                parts.append(
+                    f"            <dct:hasPart>\n"
+                    f"{_render_test_case(test_case, '              ')}"
+                    f"            </dct:hasPart>\n"
+                )
+            else:
+                parts.append(
+                    f"            <dct:hasPart "
+                    f"rdf:resource={quoteattr(test_case.identifier)}/>\n"
+                )
+        parts.append(
+            f"{_render_counts(class_test_cases, '            ')}"
+            f"            <dct:title>{escape(conformance_class)}</dct:title>\n"
+            f"            <dct:description>Synthetic conformance class "
+            f"{escape(conformance_class)}</dct:description>\n"
+            f"          </earl:TestRequirement>\n"
+            f"        </rdf:li>\n"
+        )
+    duration_seconds = len(test_cases) / 1000
+    created = _BASE_DATE.isoformat(
+        timespec="milliseconds").replace("+00:00", "Z")
+    parts.append(
+        f"      </rdf:Seq>\n"
+        f"    </cite:requirements>\n"
+        f"{_render_counts(test_cases, '    ')}"
+        f'    <dct:extent rdf:datatype="{_XSD}duration">'
+        f"PT{duration_seconds:.3f}S</dct:extent>\n"
+        f"    <cite:inputs>\n"
+        f"      <rdf:Bag>\n"
+        f'        <rdf:li rdf:parseType="Resource">\n'
+        f"          <dct:title>iut</dct:title>\n"
+        f"          <dct:description>http://localhost:5000</dct:description>\n"
+        f"        </rdf:li>\n"
+        f'        <rdf:li rdf:parseType="Resource">\n'
+        f"          <dct:title>noofcollections</dct:title>\n"
+        f"          <dct:description>-1</dct:description>\n"
+        f"        </rdf:li>\n"
+        f"      </rdf:Bag>\n"
+        f"    </cite:inputs>\n"
+        f"    <cite:testSuiteType>testng</cite:testSuiteType>\n"
+        f"    <dct:title>{escape(config.suite_title)}</dct:title>\n"
+        f"    <dct:identifier>{escape(config.suite_identifier)}</dct:identifier>\n"
+        f"    <dct:created>{created}</dct:created>\n"
+        f"  </cite:TestRun>\n"
+    )
+    return "".join(parts)
+
+
+def _render_counts(test_cases: list[_TestCase], indent: str) -> str:
+    counts = {"passed": 0, "failed": 0, "untested": 0}
+    for test_case in test_cases:
+        counts[test_case.outcome] += 1
+    return (
+        f'{indent}<cite:testsPassed rdf:datatype="{_XSD}int">'
+        f"{counts['passed']}</cite:testsPassed>\n"
+        f'{indent}<cite:testsSkipped rdf:datatype="{_XSD}int">'
+        f"{counts['untested']}</cite:testsSkipped>\n"
+        f'{indent}<cite:testsFailed rdf:datatype="{_XSD}int">'
+        f"{counts['failed']}</cite:testsFailed>\n"
+    )
@@ -0,0 +1,388 @@
+"""Performance benchmarks for parsing and serializing test suite results.
+
+These are skipped unless pytest is called with `--run-benchmarks`. Results
+are compared against the baselines stored in `baselines.json` and a
+benchmark fails if its throughput or peak memory has regressed by more than
+the allowed tolerance. Call pytest with `--update-benchmark-baselines` in
+order to store the current results as the new baselines.
+
+Throughput depends on the machine and on how busy it is, so each repeat of a
+benchmark is paired with a run of a fixed calibration workload. Regressions
+are checked on the median ratio of the benchmark's throughput to that of the
+calibration workload, which is much more stable than the raw throughput. The
+calibration has to be bound by the same thing as the benchmark: a pure python
+loop for most of them, and parsing a fixed document with libxml2 for the
+benchmarks of XML parsing.
+
+Peak memory is measured with tracemalloc, which only sees allocations made
+by python. Benchmarks of XML parsing, where most memory is allocated by
+libxml2, measure the growth of the peak RSS of a subprocess instead.
+"""
+
+import functools
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing
+from pathlib import Path
+
+import pytest
+
+from ogc_cite_action import (
+    config,
+    teamengine_runner,
+)
+from ogc_cite_action.parsers import (
+    earl,
+    earl_parallel,
+)
+from ogc_cite_action.serializers import simple
+
+import earl_generator
+
+_BASELINES_PATH = Path(__file__).parent / "baselines.json"
+_SIZES = (1_000, 10_000, 100_000)
+_CALIBRATION_OPS = 100_000
+_XML_CALIBRATION_NUM_ASSERTIONS = 5_000
+_MIN_REPEATS = 5
+# parses a raw result, either from its path or after reading it into a
+# string, and prints by how many bytes this grew the process' peak RSS
+_XML_PARSE_RSS_SCRIPT = """
+import resource
+import sys
+from pathlib import Path
+
+from ogc_cite_action import teamengine_runner
+
+
+def get_peak_rss():
+    # on linux, ru_maxrss is inherited from the parent process across exec,
+    # so it would hide anything smaller than the peak RSS of pytest itself
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss * (1 if sys.platform == "darwin" else 1024)
+
+
+raw_path = Path(sys.argv[2])
+before = get_peak_rss()
+raw_result = raw_path.read_text() if sys.argv[1] == "str" else raw_path
+root = teamengine_runner._parse_raw_result_as_xml(raw_result)
+print(get_peak_rss() - before)
+"""
+
+
+@functools.cache
+def _get_raw_document(num_assertions: int) -> str:
+    return earl_generator.generate_earl_document(
+        earl_generator.EarlGeneratorConfig(num_assertions=num_assertions))
+
+
+@functools.cache
+def _get_parsed_result(num_assertions: int):
+    return earl.parse_test_suite_result(
+        teamengine_runner._parse_raw_result_as_xml(
+            _get_raw_document(num_assertions)),
+        treat_skipped_as_failure=True
+    )
+
+
+def _measure_calibration() -> float:
+    """Measure how many operations of a fixed pure python workload run per second.
+
+    This is measured twice, as the first run pays for faulting memory back
+    in after the previous benchmark freed a lot of it.
+    """
+    durations = []
+    for _ in range(2):
+        start = time.perf_counter()
+        items = {}
+        for index in range(_CALIBRATION_OPS):
+            items[f"item-{index}"] = index % 7
+        sum(len(key) for key in items)
+        durations.append(time.perf_counter() - start)
+    return _CALIBRATION_OPS / min(durations)
+
+
+@functools.cache
+def _get_xml_calibration_document() -> bytes:
+    return _get_raw_document(_XML_CALIBRATION_NUM_ASSERTIONS).encode()
+
+
+def _measure_xml_calibration() -> float:
+    """Measure how many assertions of a fixed document libxml2 parses per second."""
+    document = _get_xml_calibration_document()
+    durations = []
+    for _ in range(2):
+        start = time.perf_counter()
+        teamengine_runner._parse_raw_result_as_xml(document)
+        durations.append(time.perf_counter() - start)
+    return _XML_CALIBRATION_NUM_ASSERTIONS / min(durations)
+
+
+def _measure_xml_parse_rss(raw_path: Path, as_string: bool) -> int:
+    completed = subprocess.run(
+        [
+            sys.executable, "-c", _XML_PARSE_RSS_SCRIPT,
+            "str" if as_string else "path", str(raw_path)
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return int(completed.stdout)
+
+
+@pytest.fixture(scope="session")
+def baselines(pytestconfig):
+    stored = (
+        json.loads(_BASELINES_PATH.read_text())
+        if _BASELINES_PATH.exists() else {}
+    )
+    current = {}
+    yield stored, current
+    if pytestconfig.getoption("--update-benchmark-baselines") and current:
+        stored.update(current)
+        _BASELINES_PATH.write_text(
+            json.dumps(stored, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def check_benchmark(request, pytestconfig, baselines):
+    stored, current = baselines
+    tolerance = pytestconfig.getoption("--benchmark-tolerance")
+
+    def check(
+            num_assertions: int,
+            func,
+            measure_peak_memory: typing.Callable[[], int] | None = None,
+            measure_calibration: typing.Callable[[], float] = _measure_calibration,
+    ) -> None:
+        repeats = max(_MIN_REPEATS, 5_000 // num_assertions)
+        durations = []
+        relative_throughputs = []
+        # like timeit, keep garbage collections, which depend on whatever
+        # previous tests left behind, out of the measurements
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeats):
+                calibration = measure_calibration()
+                start = time.perf_counter()
+                func()
+                durations.append(time.perf_counter() - start)
+                relative_throughputs.append(
+                    num_assertions / durations[-1] / calibration)
+        finally:
+            gc.enable()
+        if measure_peak_memory is not None:
+            peak_memory = measure_peak_memory()
+        else:
+            tracemalloc.start()
+            try:
+                func()
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        result = {
+            "assertions_per_second": round(num_assertions / min(durations)),
+            "peak_memory_bytes": peak_memory,
+            "relative_throughput": round(
+                statistics.median(relative_throughputs), 6),
+        }
+        current[request.node.name] = result
+        print(f"{request.node.name}: {result}")
+        if pytestconfig.getoption("--update-benchmark-baselines"):
+            return
+        if (baseline := stored.get(request.node.name)) is None:
+            pytest.skip("no stored baseline for this benchmark")
+        min_relative_throughput = baseline["relative_throughput"] * (1 - tolerance)
+        # allow some absolute slack too, as small peaks fluctuate between runs
+        max_memory = baseline["peak_memory_bytes"] * (1 + tolerance) + 64 * 1024
+        assert result["relative_throughput"] >= min_relative_throughput, (
+            f"throughput regressed: {result['relative_throughput']} relative to "
+            f"the calibration workload vs baseline of "
+            f"{baseline['relative_throughput']} "
+            f"({result['assertions_per_second']} assertions/s vs "
+            f"{baseline['assertions_per_second']})"
+        )
+        assert result["peak_memory_bytes"] <= max_memory, (
+            f"peak memory regressed: {result['peak_memory_bytes']} bytes "
+            f"vs baseline of {baseline['peak_memory_bytes']}"
+        )
+
+    return check
+
+
+def test_generator_produces_parseable_document():
+    generator_config = earl_generator.EarlGeneratorConfig(
+        num_assertions=200,
+        num_conformance_classes=3,
+    )
+    result = earl.parse_test_suite_result(
+        teamengine_runner._parse_raw_result_as_xml(
+            earl_generator.generate_earl_document(generator_config)),
+        treat_skipped_as_failure=True
+    )
+    assert result.num_tests_total == 200
+    assert len(result.conformance_class_results) == 3
+    assert sum(
+        len(conf_class.tests) for conf_class in result.conformance_class_results
+    ) == 200
+    assert result.num_failed_tests == sum(
+        conf_class.num_failed_tests
+        for conf_class in result.conformance_class_results
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_xml_parse(check_benchmark, tmp_path, num_assertions):
+    raw_document = _get_raw_document(num_assertions)
+    raw_path = tmp_path / "raw-result.xml"
+    raw_path.write_text(raw_document)
+    check_benchmark(
+        num_assertions,
+        lambda: teamengine_runner._parse_raw_result_as_xml(raw_document),
+        lambda: _measure_xml_parse_rss(raw_path, as_string=True),
+        _measure_xml_calibration,
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_xml_parse_file(check_benchmark, tmp_path, num_assertions):
+    raw_path = earl_generator.write_earl_document(
+        earl_generator.EarlGeneratorConfig(num_assertions=num_assertions),
+        tmp_path / "raw-result.xml"
+    )
+    check_benchmark(
+        num_assertions,
+        lambda: teamengine_runner._parse_raw_result_as_xml(raw_path),
+        lambda: _measure_xml_parse_rss(raw_path, as_string=False),
+        _measure_xml_calibration,
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_model_build(check_benchmark, num_assertions):
+    root_element = teamengine_runner._parse_raw_result_as_xml(
+        _get_raw_document(num_assertions))
+    check_benchmark(
+        num_assertions,
+        lambda: earl.parse_test_suite_result(
+            root_element, treat_skipped_as_failure=True)
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("fixture_name", [
+    "raw-result-ogcapi-edr10-earl.xml",
+    "raw-result-ogcapi-features-1.0-earl.xml",
+    "raw-result-ogcapi-processes-1.0-earl.xml",
+])
+def test_benchmark_model_build_fixture(check_benchmark, fixture_name):
+    root_element = teamengine_runner._parse_raw_result_as_xml(
+        Path(__file__).parent.parent / "data" / fixture_name)
+    num_assertions = len(
+        root_element.findall("earl:Assertion", namespaces=root_element.nsmap))
+    check_benchmark(
+        num_assertions,
+        lambda: earl.parse_test_suite_result(
+            root_element, treat_skipped_as_failure=True)
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_json_serializer(check_benchmark, num_assertions):
+    parsed = _get_parsed_result(num_assertions)
+    settings = config.get_settings()
+    check_benchmark(
+        num_assertions,
+        lambda: simple.to_json(parsed, settings, None)
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_markdown_serializer(check_benchmark, num_assertions):
+    parsed = _get_parsed_result(num_assertions)
+    settings = config.get_settings()
+    jinja_environment = config._get_jinja_environment(settings)
+    check_benchmark(
+        num_assertions,
+        lambda: simple.to_markdown(parsed, settings, jinja_environment)
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_markdown_serializer_fragment_cache(
+        check_benchmark, num_assertions):
+    parsed = _get_parsed_result(num_assertions)
+    settings = config.get_settings().model_copy(
+        update={"fragment_cache_size": 1_000})
+    jinja_environment = config._get_jinja_environment(settings)
+    simple.to_markdown(parsed, settings, jinja_environment)
+    check_benchmark(
+        num_assertions,
+        lambda: simple.to_markdown(parsed, settings, jinja_environment)
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_markdown_serializer_fragment_cache_new_result(
+        check_benchmark, num_assertions):
+    # an unchanged result which has been parsed again, as in watch mode
+    parsed = _get_parsed_result(num_assertions)
+    settings = config.get_settings().model_copy(
+        update={"fragment_cache_size": 1_000})
+    jinja_environment = config._get_jinja_environment(settings)
+    simple.to_markdown(parsed, settings, jinja_environment)
+
+    def render_copy():
+        copied = parsed.model_copy(update={
+            "conformance_class_results": [
+                conformance_class.model_copy()
+                for conformance_class in parsed.conformance_class_results
+            ]
+        })
+        return simple.to_markdown(copied, settings, jinja_environment)
+
+    check_benchmark(num_assertions, render_copy)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_columnar_table(check_benchmark, num_assertions):
+    pytest.importorskip("pyarrow")
+    from ogc_cite_action.serializers import columnar
+    parsed = _get_parsed_result(num_assertions)
+    check_benchmark(num_assertions, lambda: columnar.to_table(parsed))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("num_assertions", _SIZES)
+def test_benchmark_parallel_parse(check_benchmark, num_assertions):
+    raw_document = _get_raw_document(num_assertions).encode()
+    # more workers than CPUs only measures how the OS schedules them
+    num_workers = min(4, os.cpu_count() or 1)
+    check_benchmark(
+        num_assertions,
+        lambda: earl_parallel.parse_test_suite_result(
+            raw_document, treat_skipped_as_failure=True, num_workers=num_workers)
+    )
@@ -32,3 +32,41 @@ def ogcapi_processes_1_0_response_element(
         ogcapi_processes_1_0_earl_response
 ) -> str:
     return etree.fromstring(ogcapi_processes_1_0_earl_response.encode("utf-8"))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run performance benchmarks",
+    )
+    parser.addoption(
+        "--update-benchmark-baselines",
+        action="store_true",
+        default=False,
+        help="Store benchmark results as the new baselines",
+    )
+    parser.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.25,
+        help=(
+            "Fraction by which a benchmark may be slower or use more memory "
+            "than its baseline before being flagged as a regression"
+        ),
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: performance benchmark, needs --run-benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="needs --run-benchmarks to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
@@ -0,0 +1,60 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from ogc_cite_action import (
+    archive,
+    config,
+    exceptions,
+    teamengine_runner,
+)
+
+_RAW_RESULT_PATH = (
+        Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml")
+
+
+def _get_next_run(raw_result: bytes) -> bytes:
+    """Simulate the next run of the suite, a day later and with a new failure."""
+    next_run = re.sub(
+        rb"(<dct:(?:date|created)[^>]*>)2025-03-18", rb"\g<1>2025-03-19",
+        raw_result
+    )
+    return next_run.replace(b"earl#passed", b"earl#failed", 1)
+
+
+def test_split_raw_result_is_lossless():
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    chunks = archive.split_raw_result(raw_result)
+    assert len(chunks) > 282
+    assert b"".join(chunks) == raw_result
+
+
+def test_archive_shares_chunks_between_runs(tmp_path):
+    first_run = _RAW_RESULT_PATH.read_bytes()
+    second_run = _get_next_run(first_run)
+    with archive.Archive(tmp_path / "archive.db") as archive_:
+        first = archive_.add(first_run, "first")
+        first_size = archive_.get_stats().stored_size
+        second = archive_.add(second_run, "second")
+        stats = archive_.get_stats()
+        # adding the same raw result again is a no-op
+        assert archive_.add(second_run, "again") == second
+
+        assert stats.num_runs == 2
+        assert stats.stored_size - first_size < first_size / 2
+        assert archive_.restore(first.id) == first_run
+        assert archive_.restore(second.id) == second_run
+
+
+def test_archive_streams_runs_into_the_parser(tmp_path):
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    settings = config.TeamEngineRunnerSettings()
+    with archive.Archive(tmp_path / "archive.db") as archive_:
+        run = archive_.add(raw_result, "raw-result.xml")
+        with archive_.open_run(run.id) as fh:
+            parsed = teamengine_runner.parse_test_suite_result(fh, settings, True)
+        with pytest.raises(exceptions.OgcCiteActionException):
+            archive_.restore(run.id + 1)
+    assert parsed == teamengine_runner.parse_test_suite_result(
+        raw_result, settings, True)
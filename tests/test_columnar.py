@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from ogc_cite_action import (
+    config,
+    teamengine_runner,
+)
+
+pa = pytest.importorskip("pyarrow")
+
+from ogc_cite_action.serializers import columnar  # noqa: E402
+
+_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="module")
+def parsed_results():
+    settings = config.TeamEngineRunnerSettings()
+    return [
+        teamengine_runner.parse_test_suite_result(raw_result, settings, True)
+        for raw_result in sorted(_DATA_PATH.glob("raw-result-*.xml"))
+    ]
+
+
+def test_to_table_has_one_row_per_test_case(parsed_results):
+    table = columnar.to_table(*parsed_results)
+    assert table.num_rows == sum(
+        result.num_tests_total for result in parsed_results)
+    for column_name in ("suite_title", "conformance_class", "status"):
+        assert pa.types.is_dictionary(table.schema.field(column_name).type)
+    rows = table.to_pylist()
+    first_result = parsed_results[0]
+    first_test_case = first_result.conformance_class_results[0].tests[0]
+    assert rows[0]["suite_title"] == first_result.suite_title
+    assert rows[0]["identifier"] == first_test_case.identifier
+    assert rows[0]["status"] == first_test_case.status.value
+    assert rows[0]["test_run_start"] == first_result.test_run_start
+
+
+@pytest.mark.parametrize("columnar_format", columnar.ColumnarFormat)
+def test_write_table(tmp_path, parsed_results, columnar_format):
+    table = columnar.to_table(*parsed_results)
+    target = tmp_path / f"results.{columnar_format.value}"
+    columnar.write_table(table, target, columnar_format)
+    if columnar_format == columnar.ColumnarFormat.PARQUET:
+        import pyarrow.parquet
+        written = pyarrow.parquet.read_table(target)
+    else:
+        written = pa.ipc.open_file(target).read_all()
+    assert written.equals(table)
+
+
+@pytest.mark.parametrize("columnar_format", columnar.ColumnarFormat)
+def test_append_to_dataset(tmp_path, parsed_results, columnar_format):
+    dataset_path = tmp_path / "dataset"
+    for result in parsed_results:
+        columnar.append_to_dataset(
+            columnar.to_table(result), dataset_path, columnar_format)
+    # appending again adds rows instead of replacing existing ones
+    columnar.append_to_dataset(
+        columnar.to_table(parsed_results[0]), dataset_path, columnar_format)
+    assert len(list(dataset_path.iterdir())) == len(parsed_results)
+    dataset = columnar.read_dataset(dataset_path, columnar_format)
+    assert dataset.num_rows == (
+            sum(result.num_tests_total for result in parsed_results)
+            + parsed_results[0].num_tests_total
+    )
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from ogc_cite_action import (
+    compression,
+    config,
+    exceptions,
+    teamengine_runner,
+)
+
+_RAW_RESULT_PATH = (
+        Path(__file__).parent / "data/raw-result-ogcapi-processes-1.0-earl.xml")
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("raw-result.xml", compression.Compression.NONE),
+    ("raw-result.xml.gz", compression.Compression.GZIP),
+    ("raw-result.xml.zst", compression.Compression.ZSTD),
+    ("raw-result.xml.xz", compression.Compression.XZ),
+])
+def test_compressed_raw_result_roundtrip(tmp_path, file_name, expected):
+    if expected == compression.Compression.ZSTD:
+        pytest.importorskip("zstandard")
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    target = tmp_path / file_name
+    with compression.open_raw_result(target, "wb") as fh:
+        fh.write(raw_result)
+    assert compression.detect_compression(target) == expected
+    with compression.open_raw_result(target) as fh:
+        assert fh.read() == raw_result
+    settings = config.TeamEngineRunnerSettings()
+    assert teamengine_runner.parse_test_suite_result(
+        target, settings, True
+    ) == teamengine_runner.parse_test_suite_result(
+        _RAW_RESULT_PATH, settings, True)
+
+
+def test_missing_zstd_support_is_reported_early(monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    monkeypatch.setitem(sys.modules, "compression", None)
+    compression.check_supported(compression.Compression.GZIP)
+    with pytest.raises(exceptions.OgcCiteActionException):
+        compression.check_supported(compression.Compression.ZSTD)
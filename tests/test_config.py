@@ -0,0 +1,65 @@
+from ogc_cite_action import config
+from ogc_cite_action.parsers import earl
+
+
+def test_jinja_bytecode_cache_is_reused(tmp_path):
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_dir=str(tmp_path))
+    config._get_jinja_environment(settings).get_template(
+        settings.simple_serializer_template)
+    cached = list(tmp_path.iterdir())
+    assert len(cached) == 1
+    env = config._get_jinja_environment(settings)
+    source, filename, _ = env.loader.get_source(
+        env, settings.simple_serializer_template)
+    bucket = env.bytecode_cache.get_bucket(
+        env, settings.simple_serializer_template, filename, source)
+    assert bucket.code is not None
+
+
+def test_jinja_bytecode_cache_evicts_oldest_entries(tmp_path):
+    cache = config.SizeLimitedBytecodeCache(str(tmp_path), max_size_bytes=10)
+    for index in range(3):
+        (tmp_path / (cache.pattern % f"old{index}")).write_bytes(b"x" * 6)
+    cache._prune()
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_precompiled_templates_render_the_same(
+        tmp_path,
+        ogcapi_features_1_0_response_element
+):
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False,
+        precompiled_templates_path=str(tmp_path / "compiled"),
+    )
+    config.compile_templates(settings, tmp_path / "compiled")
+    parsed = earl.parse_test_suite_result(
+        ogcapi_features_1_0_response_element, treat_skipped_as_failure=True)
+    template_name = settings.simple_serializer_template
+    precompiled = config._get_jinja_environment(settings).get_template(
+        template_name)
+    from_source = config._get_jinja_environment(
+        settings, use_precompiled_templates=False).get_template(template_name)
+    assert precompiled.filename.endswith(".py")
+    assert from_source.filename.endswith(".md")
+    assert precompiled.render(result=parsed) == from_source.render(result=parsed)
+
+
+def test_stale_precompiled_templates_are_ignored(tmp_path):
+    extra_templates_path = tmp_path / "templates"
+    extra_templates_path.mkdir()
+    (extra_templates_path / "custom.md").write_text("old {{ value }}")
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False,
+        extra_templates_path=str(extra_templates_path),
+        precompiled_templates_path=str(tmp_path / "compiled"),
+    )
+    config.compile_templates(settings, tmp_path / "compiled")
+    template = config._get_jinja_environment(settings).get_template("custom.md")
+    assert template.filename.endswith(".py")
+
+    (extra_templates_path / "custom.md").write_text("new {{ value }}")
+    template = config._get_jinja_environment(settings).get_template("custom.md")
+    assert template.filename.endswith(".md")
+    assert template.render(value=1) == "new 1"
@@ -0,0 +1,96 @@
+import threading
+from pathlib import Path
+
+import httpx
+import pytest
+
+from ogc_cite_action import (
+    config,
+    daemon,
+    models,
+    teamengine_runner,
+)
+
+_RAW_RESULT_PATH = (
+        Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml")
+
+
+@pytest.fixture
+def daemon_url():
+    settings = config.TeamEngineRunnerSettings(jinja_bytecode_cache_enabled=False)
+    context = config.CliContext(
+        settings=settings,
+        jinja_environment=config._get_jinja_environment(settings),
+    )
+    daemon_ = daemon.Daemon(context, num_workers=2, max_queued_jobs=4)
+    server = daemon.get_server(daemon_, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    daemon_.close()
+
+
+def test_daemon_parses_and_caches_results(daemon_url):
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    expected = teamengine_runner.parse_test_suite_result(
+        raw_result, config.TeamEngineRunnerSettings(), True)
+    for _ in range(2):
+        response = httpx.post(
+            f"{daemon_url}/parse", params={"output_format": "json"},
+            content=raw_result
+        )
+        assert response.status_code == 200
+        assert models.TestSuiteResult.model_validate_json(
+            response.content) == expected
+    health = httpx.get(f"{daemon_url}/health").json()
+    assert health["cached_results"] == 1
+
+
+def test_daemon_serializes_results(daemon_url):
+    parsed = teamengine_runner.parse_test_suite_result(
+        _RAW_RESULT_PATH, config.TeamEngineRunnerSettings(), True)
+    response = httpx.post(
+        f"{daemon_url}/serialize", params={"output_format": "markdown"},
+        content=parsed.model_dump_json()
+    )
+    assert response.status_code == 200
+    assert response.text.startswith(f"# Test suite {parsed.suite_title}")
+
+
+@pytest.mark.parametrize("raw_result", [b"not xml", b"<root/>"])
+def test_daemon_rejects_invalid_input(daemon_url, raw_result):
+    response = httpx.post(f"{daemon_url}/parse", content=raw_result)
+    assert response.status_code == 400
+    assert "detail" in response.json()
+
+
+def test_daemon_responds_to_unexpected_errors(daemon_url, monkeypatch):
+    def serialize(*args, **kwargs):
+        raise IndexError("list index out of range")
+
+    monkeypatch.setattr(daemon.Daemon, "serialize", serialize)
+    response = httpx.post(
+        f"{daemon_url}/parse", content=_RAW_RESULT_PATH.read_bytes())
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error"}
+
+
+def test_job_queue_rejects_jobs_when_full():
+    release = threading.Event()
+    job_queue = daemon.JobQueue(num_workers=1, max_queued_jobs=1)
+    try:
+        running = job_queue.submit(release.wait)
+        # wait until the worker is busy, so that the next job stays queued
+        while job_queue.num_queued_jobs > 0:
+            pass
+        queued = job_queue.submit(lambda: "done")
+        with pytest.raises(daemon.QueueFullError):
+            job_queue.submit(lambda: "rejected")
+        release.set()
+        assert running.result(timeout=5) is True
+        assert queued.result(timeout=5) == "done"
+    finally:
+        release.set()
+        job_queue.shutdown()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from ogc_cite_action import (
+    config,
+    teamengine_runner,
+)
+from ogc_cite_action.parsers import (
+    earl,
+    earl_parallel,
+)
+
+_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("raw_result_path", sorted(_DATA_PATH.glob("*.xml")))
+def test_parallel_parse_matches_sequential_parse(raw_result_path):
+    raw_result = raw_result_path.read_bytes()
+    expected = earl.parse_test_suite_result(
+        etree.fromstring(raw_result), treat_skipped_as_failure=True)
+    parsed = earl_parallel.parse_test_suite_result(
+        raw_result, True, num_workers=2, min_chunk_size=10)
+    assert parsed.model_dump_json() == expected.model_dump_json()
+
+
+def test_split_ignores_nested_assertions():
+    raw_result = (
+            _DATA_PATH / "raw-result-ogcapi-edr10-earl.xml").read_bytes()
+    split = earl_parallel.EarlDocumentSplit(raw_result)
+    num_assertions = len(split.assertion_spans)
+    # an assertion that is not a direct child of the root is not a test result
+    nested = raw_result[slice(*split.assertion_spans[0])]
+    raw_result = raw_result.replace(
+        b"</cite:TestRun>", nested + b"</cite:TestRun>")
+    split = earl_parallel.EarlDocumentSplit(raw_result)
+    assert len(split.assertion_spans) == num_assertions + 1
+    expected = earl.parse_test_suite_result(
+        etree.fromstring(raw_result), treat_skipped_as_failure=True)
+    parsed = earl_parallel.parse_test_suite_result(
+        raw_result, True, num_workers=1, min_chunk_size=5)
+    assert parsed == expected
+
+
+def test_parallel_parse_falls_back_to_sequential_parse():
+    raw_result = (
+            _DATA_PATH / "raw-result-ogcapi-edr10-earl.xml").read_bytes()
+    raw_result = raw_result.replace(
+        b"<earl:Assertion", b"<!-- <earl:Assertion> --><earl:Assertion", 1)
+    expected = earl.parse_test_suite_result(
+        etree.fromstring(raw_result), treat_skipped_as_failure=True)
+    assert earl_parallel.parse_test_suite_result(
+        raw_result, True, num_workers=2, min_chunk_size=5) == expected
+
+
+def test_parse_workers_setting_enables_parallel_parse():
+    raw_result_path = _DATA_PATH / "raw-result-ogcapi-features-1.0-earl.xml"
+    assert teamengine_runner.parse_test_suite_result(
+        raw_result_path, config.TeamEngineRunnerSettings(parse_workers=2), True
+    ) == teamengine_runner.parse_test_suite_result(
+        raw_result_path, config.TeamEngineRunnerSettings(), True)
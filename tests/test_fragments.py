@@ -0,0 +1,75 @@
+from ogc_cite_action import config
+from ogc_cite_action.parsers import earl
+from ogc_cite_action.serializers import simple
+
+
+def _change_first_test_case_detail(parsed, conformance_class_index: int):
+    conformance_classes = list(parsed.conformance_class_results)
+    conformance_class = conformance_classes[conformance_class_index]
+    tests = list(conformance_class.tests)
+    tests[0] = tests[0].model_copy(update={"detail": "something changed"})
+    conformance_classes[conformance_class_index] = conformance_class.model_copy(
+        update={"tests": tests})
+    return parsed.model_copy(
+        update={"conformance_class_results": conformance_classes})
+
+
+def test_fragment_cache_renders_the_same_and_only_changed_classes(
+        ogcapi_features_1_0_response_element
+):
+    uncached_settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False)
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False, fragment_cache_size=100)
+    uncached_env = config._get_jinja_environment(uncached_settings)
+    env = config._get_jinja_environment(settings)
+    cache = env.globals["render_fragment"].cache
+    parsed = earl.parse_test_suite_result(
+        ogcapi_features_1_0_response_element, treat_skipped_as_failure=True)
+
+    rendered = simple.to_markdown(parsed, settings, env)
+    assert rendered == simple.to_markdown(parsed, uncached_settings, uncached_env)
+    num_fragments = len(cache)
+    assert num_fragments > 0
+    assert simple.to_markdown(parsed, settings, env) == rendered
+    assert len(cache) == num_fragments
+
+    changed = _change_first_test_case_detail(parsed, 0)
+    assert simple.to_markdown(changed, settings, env) == simple.to_markdown(
+        changed, uncached_settings, uncached_env)
+    assert 0 < len(cache) - num_fragments <= 3
+
+
+def test_fragment_cache_dir_is_reused(tmp_path, ogcapi_features_1_0_response_element):
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False,
+        fragment_cache_dir=str(tmp_path),
+    )
+    parsed = earl.parse_test_suite_result(
+        ogcapi_features_1_0_response_element, treat_skipped_as_failure=True)
+    rendered = simple.to_markdown(
+        parsed, settings, config._get_jinja_environment(settings))
+    num_fragments = len(list(tmp_path.glob("*.fragment")))
+    assert num_fragments > 0
+
+    env = config._get_jinja_environment(settings)
+    cache = env.globals["render_fragment"].cache
+    assert simple.to_markdown(parsed, settings, env) == rendered
+    assert len(list(tmp_path.glob("*.fragment"))) == num_fragments
+    assert len(cache) == 0
+
+
+def test_fragment_cache_notices_changes_made_in_place(
+        ogcapi_features_1_0_response_element
+):
+    settings = config.TeamEngineRunnerSettings(
+        jinja_bytecode_cache_enabled=False, fragment_cache_size=100)
+    env = config._get_jinja_environment(settings)
+    parsed = earl.parse_test_suite_result(
+        ogcapi_features_1_0_response_element, treat_skipped_as_failure=True)
+    simple.to_markdown(parsed, settings, env)
+
+    passed_test_case = next(
+        parsed.conformance_class_results[0].gen_passed_tests())
+    passed_test_case.description = "something changed"
+    assert "something changed" in simple.to_markdown(parsed, settings, env)
@@ -0,0 +1,22 @@
+from ogc_cite_action import instrumentation
+
+
+def test_phase_is_noop_without_active_recorder():
+    with instrumentation.phase("something"):
+        result = 1 + 1
+    assert result == 2
+
+
+def test_recorder_collects_nested_phases():
+    recorder = instrumentation.MetricsRecorder(command="test")
+    with instrumentation.recording(recorder):
+        with instrumentation.phase("outer"):
+            with instrumentation.phase("inner"):
+                data = bytearray(1024 * 1024)
+            del data
+    metrics = recorder.get_metrics()
+    assert [phase.name for phase in metrics.phases] == ["inner", "outer"]
+    inner, outer = metrics.phases
+    assert inner.peak_memory_bytes >= 1024 * 1024
+    assert outer.peak_memory_bytes >= inner.peak_memory_bytes
+    assert outer.duration_seconds >= inner.duration_seconds
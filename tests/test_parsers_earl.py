@@ -1,3 +1,4 @@
+from ogc_cite_action import models
 from ogc_cite_action.parsers import earl
 
 
@@ -55,3 +56,26 @@ def test_parse_test_suite_result_ogcapi_processes_1_0(
     assert process_description_conf_class.num_skipped_tests == 7
     assert process_description_conf_class.num_passed_tests == 0
 
+
+def test_parse_test_suite_result_groups_failures(
+        ogcapi_processes_1_0_response_element
+):
+    response = earl.parse_test_suite_result(
+        ogcapi_processes_1_0_response_element, treat_skipped_as_failure=True)
+    core_conf_class = response.conformance_class_results[0]
+    assert sum(
+        len(group.test_case_indexes) for group in core_conf_class.failure_groups
+    ) == core_conf_class.num_skipped_tests
+    largest_group = max(
+        core_conf_class.failure_groups,
+        key=lambda group: len(group.test_case_indexes)
+    )
+    assert largest_group.detail == "No details available."
+    assert len(largest_group.test_case_indexes) == 45
+    for index in largest_group.test_case_indexes:
+        assert core_conf_class.tests[index].detail == largest_group.detail
+    # groups are derived from the tests, so they follow changes to them
+    for test_case in core_conf_class.tests:
+        test_case.status = models.TestStatus.PASSED
+    assert list(core_conf_class.gen_skipped_test_groups()) == []
+    assert "failure_groups" not in core_conf_class.model_dump()
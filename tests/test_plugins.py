@@ -0,0 +1,80 @@
+import pytest
+
+from ogc_cite_action import (
+    config,
+    exceptions,
+    models,
+    plugins,
+)
+from ogc_cite_action.parsers import earl
+from ogc_cite_action.serializers import simple
+
+
+def test_registry_uses_defaults_from_settings():
+    registry = plugins.PluginRegistry(config.TeamEngineRunnerSettings())
+    assert registry.get_parser() is earl.parse_test_suite_result
+    assert registry.get_parser("ogcapi-features-1.0") is earl.parse_test_suite_result
+    assert registry.get_serializer(
+        models.ParseableOutputFormat.MARKDOWN) is simple.to_markdown
+
+
+def test_registry_matches_suite_specific_plugins_by_prefix():
+    settings = config.TeamEngineRunnerSettings(
+        suite_serializers={
+            "ogcapi-features-1.0": {
+                models.ParseableOutputFormat.MARKDOWN: (
+                    "ogc_cite_action.serializers.simple.to_json"),
+            }
+        }
+    )
+    registry = plugins.PluginRegistry(settings)
+    assert registry.get_serializer(
+        models.ParseableOutputFormat.MARKDOWN, "ogcapi-features-1.0-1.6"
+    ) is simple.to_json
+    assert registry.get_serializer(
+        models.ParseableOutputFormat.MARKDOWN, "ogcapi-processes-1.0-1.0"
+    ) is simple.to_markdown
+    assert registry.get_serializer(
+        models.ParseableOutputFormat.JSON, "ogcapi-features-1.0-1.6"
+    ) is simple.to_json
+
+
+@pytest.mark.parametrize("python_path", [
+    "ogc_cite_action.parsers.fake.parse_test_suite_result",
+    "ogc_cite_action.parsers.earl.fake",
+    "ogc_cite_action.parsers.earl.logger",
+])
+def test_registry_fails_fast_on_invalid_plugins(python_path):
+    settings = config.TeamEngineRunnerSettings(
+        suite_parsers={"ogcapi-features-1.0": python_path})
+    with pytest.raises(exceptions.OgcCiteActionException):
+        plugins.PluginRegistry(settings)
+
+
+def test_lenient_registry_records_invalid_plugins():
+    settings = config.TeamEngineRunnerSettings(
+        suite_parsers={"ogcapi-features-1.0": "ogc_cite_action.parsers.earl.fake"})
+    registry = plugins.PluginRegistry(settings, strict=False)
+    assert registry.get_parser() is earl.parse_test_suite_result
+    assert [info.python_path for info in registry.errors] == [
+        "ogc_cite_action.parsers.earl.fake"]
+    assert registry.errors[0].error is not None
+
+
+def test_get_registry_is_remembered_by_settings(monkeypatch):
+    settings = config.TeamEngineRunnerSettings()
+    registry = plugins.get_registry(settings)
+    monkeypatch.setattr(
+        config.TeamEngineRunnerSettings,
+        "model_dump_json",
+        lambda *args, **kwargs: pytest.fail("settings were dumped again"),
+    )
+    assert plugins.get_registry(settings) is registry
+    monkeypatch.undo()
+
+    updated = settings.model_copy(update={
+        "suite_parsers": {
+            "ogcapi-features-1.0": "ogc_cite_action.serializers.simple.to_json"}
+    })
+    assert plugins.get_registry(updated).get_parser(
+        "ogcapi-features-1.0") is simple.to_json
@@ -0,0 +1,113 @@
+import httpx
+import pytest
+
+from ogc_cite_action import (
+    config,
+    preflight,
+)
+
+_FEATURES_CORE = "http://www.opengis.net/spec/ogcapi-features-1/1.0/conf/core"
+_FEATURES_CRS = "http://www.opengis.net/spec/ogcapi-features-2/1.0/conf/crs"
+
+
+@pytest.fixture(autouse=True)
+def clear_preflight_cache():
+    preflight.clear_cache()
+    yield
+    preflight.clear_cache()
+
+
+@pytest.fixture
+def iut_requests() -> list[httpx.Request]:
+    return []
+
+
+@pytest.fixture
+def iut_client(iut_requests):
+    """Client for a stand-in IUT which only implements OGC API - Features core."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        iut_requests.append(request)
+        if request.url.path == "/":
+            return httpx.Response(200, json={"title": "stand-in IUT", "links": []})
+        elif request.url.path == "/conformance":
+            return httpx.Response(200, json={"conformsTo": [_FEATURES_CORE]})
+        return httpx.Response(404)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        yield client
+
+
+def test_preflight_prunes_suites_and_inputs(iut_client, iut_requests):
+    settings = config.TeamEngineRunnerSettings(
+        preflight_rules={
+            "ogcapi-features-1.0": config.PreflightRule(
+                conformance_classes=[_FEATURES_CORE],
+                input_conformance_classes={"crs": [_FEATURES_CRS]},
+            ),
+            "ogcapi-processes-1.0": config.PreflightRule(
+                conformance_classes=[
+                    "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/core"
+                ],
+            ),
+        }
+    )
+    report = preflight.run_preflight(
+        iut_client,
+        settings,
+        ["ogcapi-features-1.0", "ogcapi-processes-1.0", "ogcapi-common-1.0"],
+        {"iut": ["http://iut.test"], "crs": ["EPSG:3857"]},
+    )
+    assert report.capabilities.conformance_classes == [_FEATURES_CORE]
+    assert {request.url.path for request in iut_requests} == {"/", "/conformance"}
+
+    features = report.get_decision("ogcapi-features-1.0")
+    assert features.run
+    assert features.test_suite_inputs == {"iut": ["http://iut.test"]}
+    assert features.pruned_inputs == {"crs": ["EPSG:3857"]}
+    assert not report.get_decision("ogcapi-processes-1.0").run
+    # suites without a rule are always run
+    assert report.get_decision("ogcapi-common-1.0").run
+
+
+def test_preflight_caches_iut_capabilities(iut_client, iut_requests):
+    for _ in range(3):
+        preflight.get_iut_capabilities(iut_client, "http://iut.test/")
+    assert len(iut_requests) == 2
+
+
+def test_preflight_does_not_prune_when_iut_is_unreachable():
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        report = preflight.run_preflight(
+            client,
+            config.TeamEngineRunnerSettings(),
+            ["ogcapi-features-1.0"],
+            {"iut": ["http://iut.test"]},
+        )
+    decision = report.get_decision("ogcapi-features-1.0")
+    assert decision.run
+    assert decision.test_suite_inputs == {"iut": ["http://iut.test"]}
+    assert len(report.capabilities.errors) == 2
+
+
+def test_preflight_follows_relative_conformance_link():
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/":
+            return httpx.Response(200, json={
+                "links": [
+                    "not a link",
+                    {"rel": "conformance", "href": "conformance-classes"},
+                ]
+            })
+        elif request.url.path == "/conformance-classes":
+            return httpx.Response(200, json={"conformsTo": [_FEATURES_CORE]})
+        return httpx.Response(404)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        capabilities = preflight.get_iut_capabilities(client, "http://iut.test")
+    assert capabilities.conformance_classes == [_FEATURES_CORE]
@@ -0,0 +1,114 @@
+import datetime as dt
+from pathlib import Path
+
+import pytest
+
+from ogc_cite_action import (
+    config,
+    models,
+    results_store,
+    teamengine_runner,
+)
+
+_RAW_RESULT_PATH = (
+        Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml")
+
+
+@pytest.fixture(scope="module")
+def parsed_result() -> models.TestSuiteResult:
+    return teamengine_runner.parse_test_suite_result(
+        _RAW_RESULT_PATH, config.TeamEngineRunnerSettings(), True)
+
+
+def _get_run(
+        parsed_result: models.TestSuiteResult,
+        hours_later: int,
+        test_case_identifier: str,
+        status: models.TestStatus,
+) -> models.TestSuiteResult:
+    """Copy the parsed result, changing its start time and one test case."""
+    conformance_class_results = []
+    for conformance_class in parsed_result.conformance_class_results:
+        conformance_class_results.append(
+            conformance_class.model_copy(update={
+                "tests": [
+                    test_case.model_copy(update={"status": status})
+                    if test_case.identifier == test_case_identifier
+                    else test_case
+                    for test_case in conformance_class.tests
+                ]
+            })
+        )
+    return parsed_result.model_copy(update={
+        "test_run_start": (
+                parsed_result.test_run_start + dt.timedelta(hours=hours_later)),
+        "conformance_class_results": conformance_class_results,
+    })
+
+
+def test_results_store_answers_history_queries(tmp_path, parsed_result):
+    test_case_identifier = (
+        parsed_result.conformance_class_results[0].tests[0].identifier)
+    statuses = [
+        models.TestStatus.FAILED,
+        models.TestStatus.PASSED,
+        models.TestStatus.FAILED,
+        models.TestStatus.FAILED,
+    ]
+    runs = [
+        _get_run(parsed_result, index, test_case_identifier, status)
+        for index, status in enumerate(statuses)
+    ]
+    with results_store.ResultsStore(tmp_path / "results.db") as store:
+        assert len(store.ingest(*runs)) == len(runs)
+        # ingesting the same runs again is a no-op
+        assert store.ingest(runs[0]) == []
+        assert len(store.list_runs()) == len(runs)
+
+        history = store.get_history(test_case_identifier)
+        assert [occurrence.status for occurrence in history] == statuses[::-1]
+
+        last_failure = store.get_last_failure(test_case_identifier)
+        assert last_failure.test_run_start == runs[-1].test_run_start
+
+        failing_since = store.get_failing_since(test_case_identifier)
+        assert failing_since.test_run_start == runs[2].test_run_start
+
+        flaky = store.get_flaky_test_cases()
+        assert [test_case.identifier for test_case in flaky] == [
+            test_case_identifier]
+        assert flaky[0].num_status_changes == 2
+        assert flaky[0].num_failures == 3
+        assert store.get_flaky_test_cases(num_recent_runs=2) == []
+
+
+def test_results_store_keeps_every_occurrence_of_a_test_case(
+        tmp_path, parsed_result):
+    test_case_identifier = (
+        "org/opengis/cite/ogcapifeatures10/conformance/core/collections/"
+        "FeaturesTime#timeParameterDefinition"
+    )
+    with results_store.ResultsStore(tmp_path / "results.db") as store:
+        store.ingest(parsed_result)
+        num_failed, num_total = store._connection.execute(
+            "SELECT sum(status = ?), count(*) FROM test_cases",
+            (models.TestStatus.FAILED.value,)
+        ).fetchone()
+        assert num_failed == parsed_result.num_failed_tests
+        assert num_total == parsed_result.num_tests_total
+        # occurrences that passed do not hide the ones that failed
+        history = store.get_history(test_case_identifier)
+        assert [occurrence.status for occurrence in history] == [
+            models.TestStatus.FAILED]
+        assert history[0].detail is not None
+
+
+def test_results_store_skips_stored_results_without_iut(tmp_path, parsed_result):
+    without_iut = parsed_result.model_copy(update={"inputs": []})
+    with results_store.ResultsStore(tmp_path / "results.db") as store:
+        assert len(store.ingest(without_iut)) == 1
+        assert store.ingest(without_iut) == []
+        # suites are matched with or without the version of the executable suite
+        assert len(store.list_runs(suite_title="ogcapi-features-1.0")) == 1
+        assert len(store.list_runs(suite_title=parsed_result.suite_title)) == 1
+        assert store.list_runs(suite_title="ogcapi-processes-1.0") == []
@@ -0,0 +1,170 @@
+from pathlib import Path
+
+import httpx
+import pytest
+
+from ogc_cite_action import (
+    config,
+    exceptions,
+    plugins,
+    teamengine_runner,
+)
+from ogc_cite_action.parsers import earl
+
+
+@pytest.fixture
+def network_settings() -> config.NetworkSettings:
+    return config.NetworkSettings(retry_backoff_seconds=0)
+
+
+def test_http_client_retries_transient_status_codes(network_settings):
+    status_codes = iter([503, 502, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(status_codes))
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        response = client.get("http://teamengine/teamengine/")
+    assert response.status_code == 200
+
+
+def test_http_client_retries_transport_errors(network_settings):
+    num_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal num_calls
+        num_calls += 1
+        raise httpx.ConnectError("refused", request=request)
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get("http://teamengine/teamengine/")
+    assert num_calls == network_settings.max_retries + 1
+
+
+def test_http_client_does_not_retry_errors_after_sending(network_settings):
+    num_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal num_calls
+        num_calls += 1
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        with pytest.raises(httpx.ReadTimeout):
+            client.get("http://teamengine/teamengine/")
+    assert num_calls == 1
+
+
+def test_readiness_probe_is_not_retried_by_transport(network_settings):
+    num_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal num_calls
+        num_calls += 1
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        assert not teamengine_runner.wait_for_teamengine_to_be_ready(
+            client, "http://teamengine/teamengine", num_attempts=2, wait_seconds=0)
+    assert num_calls == 2
+
+
+def test_execute_test_suite_is_not_retried(network_settings):
+    num_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal num_calls
+        num_calls += 1
+        return httpx.Response(504)
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        with pytest.raises(exceptions.OgcCiteActionException):
+            teamengine_runner.execute_test_suite(
+                client, "http://teamengine/teamengine", "ogcapi-features-1.0")
+    assert num_calls == 1
+
+
+def test_retry_after_is_capped():
+    transport = teamengine_runner.RetryingTransport(
+        httpx.MockTransport(lambda request: httpx.Response(200)),
+        max_wait_seconds=30,
+    )
+    assert transport._get_wait_seconds(0, "3600") == 30
+    assert transport._get_wait_seconds(0, "5") == 5
+
+
+def test_http_client_does_not_retry_non_idempotent_requests(network_settings):
+    num_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal num_calls
+        num_calls += 1
+        return httpx.Response(503)
+
+    with teamengine_runner.get_http_client(
+            network_settings, 5, transport=httpx.MockTransport(handler)
+    ) as client:
+        response = client.post("http://teamengine/teamengine/")
+    assert response.status_code == 503
+    assert num_calls == 1
+
+
+def test_parse_test_suite_result_accepts_multiple_input_types(
+        ogcapi_features_1_0_earl_response
+):
+    raw_path = Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml"
+    settings = config.TeamEngineRunnerSettings()
+    from_str = teamengine_runner.parse_test_suite_result(
+        ogcapi_features_1_0_earl_response, settings, True)
+    from_bytes = teamengine_runner.parse_test_suite_result(
+        raw_path.read_bytes(), settings, True)
+    from_path = teamengine_runner.parse_test_suite_result(
+        raw_path, settings, True)
+    with raw_path.open("rb") as fh:
+        from_file = teamengine_runner.parse_test_suite_result(
+            fh, settings, True)
+    assert from_str == from_bytes == from_path == from_file
+
+
+def test_parse_test_suite_result_reports_invalid_xml(tmp_path):
+    invalid_path = tmp_path / "invalid.xml"
+    invalid_path.write_bytes(b"<rdf:RDF>not xml")
+    with pytest.raises(exceptions.OgcCiteActionException):
+        teamengine_runner.parse_test_suite_result(
+            invalid_path, config.TeamEngineRunnerSettings(), True)
+
+
+@pytest.mark.parametrize("test_suite_identifier", [None, "ogcapi-features-1.0"])
+def test_parse_test_suite_result_uses_suite_specific_parser(
+        test_suite_identifier, monkeypatch):
+    parsed = []
+
+    def parse(suite_result, treat_skipped_as_failure):
+        parsed.append(suite_result)
+        return earl.parse_test_suite_result(suite_result, treat_skipped_as_failure)
+
+    monkeypatch.setattr(earl, "parse_features", parse, raising=False)
+    monkeypatch.setattr(plugins, "_registries", {})
+    settings = config.TeamEngineRunnerSettings(
+        suite_parsers={
+            "ogcapi-features-1.0": "ogc_cite_action.parsers.earl.parse_features"}
+    )
+    result = teamengine_runner.parse_test_suite_result(
+        Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml",
+        settings,
+        True,
+        test_suite_identifier=test_suite_identifier,
+    )
+    assert len(parsed) == 1
+    assert result.suite_title == "ogcapi-features-1.0-1.6"
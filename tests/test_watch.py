@@ -0,0 +1,171 @@
+from pathlib import Path
+
+import httpx
+import pytest
+
+from ogc_cite_action import (
+    config,
+    models,
+    teamengine_runner,
+    watch,
+)
+
+_RAW_RESULT_PATH = (
+        Path(__file__).parent / "data/raw-result-ogcapi-features-1.0-earl.xml")
+
+
+@pytest.fixture
+def iut_documents() -> dict[str, bytes]:
+    return {
+        "/": (
+            b'{"links": [{"rel": "service-desc", '
+            b'"href": "http://iut.test/openapi"}]}'
+        ),
+        "/conformance": b'{"conformsTo": []}',
+        "/openapi": b'{"openapi": "3.0.0"}',
+    }
+
+
+@pytest.fixture
+def iut_requests() -> list[httpx.Request]:
+    return []
+
+
+@pytest.fixture
+def iut_client(iut_documents, iut_requests):
+    """Client for a stand-in IUT which supports conditional requests."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        iut_requests.append(request)
+        if (content := iut_documents.get(request.url.path)) is None:
+            return httpx.Response(404)
+        etag = f'"{hash(content)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=content, headers={"ETag": etag})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        yield client
+
+
+def test_fingerprint_changes_only_with_iut(iut_client, iut_documents, iut_requests):
+    fingerprinter = watch.IutFingerprinter(iut_client, "http://iut.test/")
+    fingerprint = fingerprinter.get_fingerprint()
+    assert [request.url.path for request in iut_requests] == [
+        "/", "/conformance", "/openapi"]
+
+    assert fingerprinter.get_fingerprint() == fingerprint
+    assert all(
+        request.headers.get("If-None-Match") is not None
+        for request in iut_requests[3:]
+    )
+
+    iut_documents["/openapi"] = b'{"openapi": "3.1.0"}'
+    assert fingerprinter.get_fingerprint() != fingerprint
+
+
+def _copy_with_status(
+        result: models.TestSuiteResult,
+        index: int,
+        status: models.TestStatus,
+) -> models.TestSuiteResult:
+    conformance_class = result.conformance_class_results[0]
+    tests = list(conformance_class.tests)
+    tests[index] = tests[index].model_copy(update={"status": status})
+    return result.model_copy(update={
+        "conformance_class_results": [
+            conformance_class.model_copy(update={"tests": tests}),
+            *result.conformance_class_results[1:],
+        ]
+    })
+
+
+def test_diff_results_reports_status_changes_only():
+    previous = teamengine_runner.parse_test_suite_result(
+        _RAW_RESULT_PATH, config.TeamEngineRunnerSettings(), True)
+    test_case = previous.conformance_class_results[0].tests[0]
+    new_status = (
+        models.TestStatus.FAILED if test_case.status != models.TestStatus.FAILED
+        else models.TestStatus.PASSED
+    )
+    current = _copy_with_status(previous, 0, new_status)
+
+    assert watch.diff_results(previous, previous) == []
+    changes = watch.diff_results(previous, current)
+    assert [(change.identifier, change.previous_status, change.status)
+            for change in changes] == [
+        (test_case.identifier, test_case.status, new_status)]
+
+
+def test_watcher_only_runs_suite_when_iut_changes(
+        iut_client, iut_documents, monkeypatch):
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    suite_runs = []
+
+    def run_test_suite(*args, **kwargs):
+        suite_runs.append(kwargs["test_suite_arguments"])
+        return raw_result
+
+    monkeypatch.setattr(teamengine_runner, "run_test_suite", run_test_suite)
+    watcher = watch.Watcher(
+        iut_client,
+        config.TeamEngineRunnerSettings(),
+        "http://teamengine.test/teamengine",
+        "ogcapi-features-1.0",
+        {"iut": ["http://iut.test"]},
+    )
+    first_run = watcher.poll()
+    assert first_run.is_first_run
+    assert watcher.poll() is None
+
+    iut_documents["/conformance"] = b'{"conformsTo": ["something-new"]}'
+    second_run = watcher.poll()
+    assert not second_run.is_first_run
+    assert second_run.changes == []
+    assert len(suite_runs) == 2
+
+
+def test_watcher_skips_polls_while_iut_is_unavailable(
+        iut_client, iut_documents, monkeypatch):
+    raw_result = _RAW_RESULT_PATH.read_bytes()
+    suite_runs = []
+
+    def run_test_suite(*args, **kwargs):
+        suite_runs.append(kwargs["test_suite_arguments"])
+        return raw_result
+
+    monkeypatch.setattr(teamengine_runner, "run_test_suite", run_test_suite)
+    watcher = watch.Watcher(
+        iut_client,
+        config.TeamEngineRunnerSettings(),
+        "http://teamengine.test/teamengine",
+        "ogcapi-features-1.0",
+        {"iut": ["http://iut.test"]},
+    )
+    watcher.poll()
+    fingerprint = watcher.fingerprint
+
+    def unavailable_handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with httpx.Client(
+            transport=httpx.MockTransport(unavailable_handler)) as client:
+        watcher.fingerprinter.client = client
+        assert watcher.fingerprinter.get_fingerprint() is None
+        assert watcher.poll() is None
+    assert watcher.fingerprint == fingerprint
+    assert len(suite_runs) == 1
+
+    # the IUT is back, unchanged
+    watcher.fingerprinter.client = iut_client
+    assert watcher.poll() is None
+    assert len(suite_runs) == 1
+
+
+def test_fingerprint_resolves_relative_links(
+        iut_client, iut_documents, iut_requests):
+    iut_documents["/"] = b'{"links": [{"rel": "service-desc", "href": "/openapi"}]}'
+    fingerprinter = watch.IutFingerprinter(iut_client, "http://iut.test/")
+    assert fingerprinter.get_fingerprint() is not None
+    assert [request.url.path for request in iut_requests] == [
+        "/", "/conformance", "/openapi"]